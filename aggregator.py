@@ -0,0 +1,72 @@
+"""Сводки ошибок вместо сообщения на каждую ошибку."""
+import time
+from collections import OrderedDict
+
+MAX_FINGERPRINTS = 10000
+
+
+class ErrorAggregator:
+    """Копит ошибки по студенту и классу исключения за окно window.
+    По окончании окна collect() возвращает по одной сводке на
+    студента. Строка сводки с тем же отпечатком (студент, класс),
+    что уже отправлялся за последние repeat_after секунд,
+    подавляется. Отпечатков хранится не больше max_fingerprints.
+    """
+
+    def __init__(self, window=300, repeat_after=3600,
+                 max_fingerprints=MAX_FINGERPRINTS, clock=time.monotonic):
+        """Сводка копится window секунд.
+        Повтор той же ошибки отправляется не раньше чем через
+        repeat_after секунд.
+        """
+        self.window = window
+        self.repeat_after = repeat_after
+        self.max_fingerprints = max_fingerprints
+        self.clock = clock
+        self.window_end = clock() + window
+        self.buckets = {}
+        self.reported = OrderedDict()
+
+    def record(self, tenant_id, error):
+        """Учитывает ошибку студента в текущем окне."""
+        bucket = self.buckets.setdefault(tenant_id, {})
+        name = type(error).__name__
+        count, _ = bucket.get(name, (0, None))
+        bucket[name] = (count + 1, str(error))
+
+    def is_reported(self, fingerprint, now):
+        """Такая же строка уже уходила недавно."""
+        reported_at = self.reported.get(fingerprint)
+        return (
+            reported_at is not None
+            and now - reported_at < self.repeat_after
+        )
+
+    def report(self, fingerprint, now):
+        """Запоминает отправленную строку, старые вытесняются."""
+        self.reported[fingerprint] = now
+        self.reported.move_to_end(fingerprint)
+        while len(self.reported) > self.max_fingerprints:
+            self.reported.popitem(last=False)
+
+    def collect(self):
+        """Сводки закончившегося окна: tenant_id -> [(класс, число, текст)].
+        Пока окно не закончилось, возвращает пустой словарь.
+        """
+        now = self.clock()
+        if now < self.window_end:
+            return {}
+        self.window_end = now + self.window
+        buckets, self.buckets = self.buckets, {}
+        digests = {}
+        for tenant_id, bucket in buckets.items():
+            lines = []
+            for name, (count, message) in sorted(bucket.items()):
+                fingerprint = (tenant_id, name)
+                if self.is_reported(fingerprint, now):
+                    continue
+                self.report(fingerprint, now)
+                lines.append((name, count, message))
+            if lines:
+                digests[tenant_id] = lines
+        return digests
@@ -0,0 +1,116 @@
+"""Бенчмарк холодного старта: время импорта модуля homework.
+Запуск из корня репозитория:
+
+    python benchmarks/startup.py --runs 20 --max-import 50
+
+Каждый замер — отдельный процесс интерпретатора. Печатает медиану и
+максимум времени импорта в миллисекундах и самые дорогие модули из
+-X importtime. С --max-import завершается с кодом 1, если медиана
+превышает бюджет.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+root_dir = dirname(dirname(abspath(__file__)))
+
+MEASURE = (
+    'import time; start = time.perf_counter(); import {module}; '
+    'print((time.perf_counter() - start) * 1000)'
+)
+
+
+def parse_args(argv=None):
+    """Параметры бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='homework')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10,
+                        help='сколько самых дорогих модулей показать')
+    parser.add_argument('--max-import', type=float,
+                        help='бюджет на медиану времени импорта, мс')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результат одной строкой JSON')
+    return parser.parse_args(argv)
+
+
+def import_time(module):
+    """Время импорта модуля в свежем процессе, мс."""
+    output = subprocess.run(
+        [sys.executable, '-c', MEASURE.format(module=module)],
+        cwd=root_dir, check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip())
+
+
+def import_timings(code):
+    """Накопленное время импорта каждого модуля, мкс."""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=root_dir, check=True, capture_output=True, text=True,
+    ).stderr
+    timings = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def heaviest_imports(module, top):
+    """Самые дорогие модули, которые тянет за собой module.
+    Модули, загружаемые самим интерпретатором при старте, не учитываются.
+    """
+    baseline = import_timings('pass')
+    timings = import_timings(f'import {module}')
+    return sorted(
+        (
+            (cumulative, name)
+            for name, cumulative in timings.items()
+            if name not in baseline
+        ),
+        reverse=True,
+    )[:top]
+
+
+def run(args):
+    """Замеряет импорт и собирает результат."""
+    timings = [import_time(args.module) for _ in range(args.runs)]
+    return {
+        'module': args.module,
+        'median_import_ms': round(statistics.median(timings), 2),
+        'max_import_ms': round(max(timings), 2),
+        'heaviest_us': [
+            f'{name} {cumulative}'
+            for cumulative, name in heaviest_imports(args.module, args.top)
+        ],
+    }
+
+
+def main(argv=None):
+    """Запускает бенчмарк и проверяет бюджет."""
+    args = parse_args(argv)
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            if isinstance(value, list):
+                print(f'{key:>18}:')
+                for item in value:
+                    print(f'{"":>20}{item}')
+            else:
+                print(f'{key:>18}: {value}')
+    failed = (
+        args.max_import is not None
+        and result['median_import_ms'] > args.max_import
+    )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
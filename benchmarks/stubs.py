@@ -0,0 +1,167 @@
+"""Локальные заменители API Практикума и Telegram Bot API для бенчмарков."""
+import json
+import random
+import re
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+NAME_PATTERN = re.compile(r'"hw:(\d+)"')
+
+
+class StubServer(ThreadingHTTPServer):
+    """HTTP-сервер со счётчиками, общими для всех обработчиков."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0, payload=1,
+                 payload_bytes=0):
+        """Сервер отвечает с задержкой latency секунд.
+        Доля error_rate ответов — ошибки, payload — число домашек
+        в ответе.
+        """
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.payload = payload
+        self.padding = 'x' * payload_bytes
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.polls = {}
+        self.latencies = []
+
+    @property
+    def url(self):
+        """Адрес сервера."""
+        host, port = self.server_address
+        return f'http://{host}:{port}'
+
+    def stats(self):
+        """Счётчики сервера."""
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'latencies': list(self.latencies),
+            }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Общая часть обработчиков: задержка, ошибки, ответ в JSON."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Не засоряет вывод бенчмарка."""
+
+    def send_json(self, data, status=HTTPStatus.OK):
+        """Отправляет JSON-ответ с keep-alive."""
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        """Читает тело запроса."""
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def simulate(self):
+        """Задержка и случайная ошибка. True, если ответ уже отправлен."""
+        if self.path.startswith('/stats'):
+            self.send_json(self.server.stats())
+            return True
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+            failed = random.random() < self.server.error_rate
+            if failed:
+                self.server.errors += 1
+        if failed:
+            self.send_json({}, HTTPStatus.INTERNAL_SERVER_ERROR)
+        return failed
+
+
+class PracticumHandler(StubHandler):
+    """Каждый опрос меняет статус домашки hw:<время ответа в нс>.
+    Остальные payload - 1 домашек не меняются и лишь увеличивают ответ.
+    """
+
+    def do_GET(self):
+        """Отвечает списком домашек студента."""
+        if self.simulate():
+            return
+        token = self.headers.get('Authorization', '')
+        with self.server.lock:
+            poll = self.server.polls.get(token, 0)
+            self.server.polls[token] = poll + 1
+        homeworks = [{
+            'id': 1,
+            'homework_name': f'hw:{time.monotonic_ns()}',
+            'status': STATUSES[poll % len(STATUSES)],
+            'reviewer_comment': self.server.padding,
+        }]
+        homeworks.extend(
+            {
+                'id': number,
+                'homework_name': f'old {number}',
+                'status': 'approved',
+                'reviewer_comment': self.server.padding,
+            }
+            for number in range(2, self.server.payload + 1)
+        )
+        self.send_json(
+            {'homeworks': homeworks, 'current_date': int(time.time())}
+        )
+
+
+class TelegramHandler(StubHandler):
+    """Принимает sendMessage и считает задержку от ответа Практикума."""
+
+    def do_POST(self):
+        """Отвечает как Bot API на sendMessage."""
+        if self.simulate():
+            return
+        body = self.read_body()
+        if self.headers.get('Content-Type', '').startswith(
+            'application/json'
+        ):
+            params = json.loads(body or b'{}')
+        else:
+            params = {
+                key: values[0]
+                for key, values in parse_qs(body.decode('utf-8')).items()
+            }
+        match = NAME_PATTERN.search(str(params.get('text', '')))
+        if match:
+            latency = (time.monotonic_ns() - int(match.group(1))) / 1e9
+            with self.server.lock:
+                self.server.latencies.append(latency)
+        self.send_json({'ok': True, 'result': {
+            'message_id': self.server.requests,
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'text': params.get('text', ''),
+        }})
+
+    do_GET = do_POST
+
+
+def start_in_process(server, context):
+    """Запускает сервер в отдельном процессе.
+    Сокет уже открыт, дочерний процесс наследует его при fork.
+    Время CPU заменителей не попадает в замеры бота.
+    """
+    process = context.Process(target=server.serve_forever, daemon=True)
+    process.start()
+    server.socket.close()
+    return process
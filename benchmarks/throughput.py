@@ -0,0 +1,219 @@
+"""Бенчмарк пропускной способности бота на локальных заменителях API.
+Запуск из корня репозитория:
+
+    python benchmarks/throughput.py --tenants 1000 --duration 30
+
+Печатает опросы в секунду, p50/p99 задержки от ответа API до
+доставки уведомления, процессорное время и память процесса бота.
+С --min-polls и --max-p99 завершается с кодом 1 при регрессии.
+Движок собирается как в боте: отметки, outbox и history лежат во
+временной базе SQLite. С --memory они не используются.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from os.path import abspath, dirname
+
+import requests
+
+root_dir = dirname(dirname(abspath(__file__)))
+sys.path.append(root_dir)
+
+import homework  # noqa: E402
+from engine import PollingEngine  # noqa: E402
+from settings import get_settings  # noqa: E402
+from stubs import (PracticumHandler, StubServer, TelegramHandler,  # noqa
+                   start_in_process)
+from storage import (HistoryStore, OutboxStore,  # noqa: E402
+                     WatermarkStore)
+from tenants import Tenant  # noqa: E402
+
+
+class FixedPolicy:
+    """Опрос каждого студента с постоянным интервалом."""
+
+    def __init__(self, interval):
+        """Все опросы идут раз в interval секунд."""
+        self.interval = interval
+
+    def next_interval(self, state):
+        """Интервал не зависит от состояния студента."""
+        return self.interval
+
+
+def percentile(values, percent):
+    """Перцентиль выборки или None для пустой выборки."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def current_rss_kb():
+    """Текущий RSS процесса в килобайтах."""
+    with open('/proc/self/statm') as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize() // 1024
+
+
+def parse_args(argv=None):
+    """Параметры бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=1)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--payload', type=int, default=1,
+                        help='домашек в каждом ответе API')
+    parser.add_argument('--payload-bytes', type=int, default=0,
+                        help='размер комментария ревьюера в каждой домашке')
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    parser.add_argument('--min-polls', type=float,
+                        help='минимально допустимые опросы в секунду')
+    parser.add_argument('--max-p99', type=float,
+                        help='максимально допустимая p99 задержка, с')
+    parser.add_argument('--memory', action='store_true',
+                        help='без базы SQLite: без отметок, outbox и history')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести результат одной строкой JSON')
+    parser.add_argument('--verbose', action='store_true',
+                        help='не отключать логи бота')
+    return parser.parse_args(argv)
+
+
+async def drive(engine, duration):
+    """Крутит движок заданное время."""
+    try:
+        await asyncio.wait_for(engine.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
+def storage_options(args, directory):
+    """Хранилища движка во временной базе, как в run_bot."""
+    if args.memory:
+        return {}
+    settings = get_settings()
+    path = f'{directory}/state.sqlite3'
+    return {
+        'watermarks': WatermarkStore(path),
+        'outbox': OutboxStore(
+            path,
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+            window=settings.NOTIFY_WINDOW,
+        ),
+        'history': HistoryStore(path),
+    }
+
+
+def run(args):
+    """Запускает заменители и движок, возвращает результаты."""
+    context = multiprocessing.get_context('fork')
+    practicum = StubServer(
+        PracticumHandler,
+        latency=args.api_latency,
+        error_rate=args.api_error_rate,
+        payload=args.payload,
+        payload_bytes=args.payload_bytes,
+    )
+    telegram_stub = StubServer(
+        TelegramHandler,
+        latency=args.telegram_latency,
+        error_rate=args.telegram_error_rate,
+    )
+    practicum_url, telegram_url = practicum.url, telegram_stub.url
+    processes = [
+        start_in_process(practicum, context),
+        start_in_process(telegram_stub, context),
+    ]
+    directory = tempfile.TemporaryDirectory()
+    try:
+        homework.ENDPOINT = (
+            f'{practicum_url}/api/user_api/homework_statuses/'
+        )
+        bot = homework.create_bot('123456:bench', f'{telegram_url}/bot')
+        tenants = [
+            Tenant(str(number), f'token{number}', number)
+            for number in range(1, args.tenants + 1)
+        ]
+        engine = PollingEngine(
+            bot,
+            tenants,
+            concurrency=args.concurrency,
+            retry_time=args.interval,
+            session=homework.create_session(
+                pool_maxsize=args.concurrency
+            ),
+            policy=FixedPolicy(args.interval),
+            **storage_options(args, directory.name),
+        )
+        engine.api_budget.rate = engine.api_budget.capacity = 10 ** 9
+        engine.dispatcher.global_bucket.rate = 10 ** 9
+        engine.dispatcher.global_bucket.capacity = 10 ** 9
+        engine.dispatcher.chat_rate = engine.dispatcher.chat_burst = 10 ** 9
+
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        started = time.monotonic()
+        asyncio.run(drive(engine, args.duration))
+        elapsed = time.monotonic() - started
+        finished = resource.getrusage(resource.RUSAGE_SELF)
+
+        api = requests.get(f'{practicum_url}/stats').json()
+        sent = requests.get(f'{telegram_url}/stats').json()
+    finally:
+        for process in processes:
+            process.terminate()
+        directory.cleanup()
+    cpu = (
+        finished.ru_utime - usage.ru_utime
+        + finished.ru_stime - usage.ru_stime
+    )
+    latencies = sent['latencies']
+    return {
+        'tenants': args.tenants,
+        'duration': round(elapsed, 3),
+        'polls': api['requests'],
+        'polls_per_second': round(api['requests'] / elapsed, 1),
+        'api_errors': api['errors'],
+        'notifications': len(latencies),
+        'p50_latency': percentile(latencies, 50),
+        'p99_latency': percentile(latencies, 99),
+        'cpu_seconds': round(cpu, 3),
+        'cpu_percent': round(100 * cpu / elapsed, 1),
+        'rss_kb': current_rss_kb(),
+        'max_rss_kb': finished.ru_maxrss,
+    }
+
+
+def main(argv=None):
+    """Точка входа бенчмарка."""
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    result = run(args)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f'{key:>18}: {value}')
+    failed = (
+        (args.min_polls is not None
+         and result['polls_per_second'] < args.min_polls)
+        or (args.max_p99 is not None
+            and (result['p99_latency'] is None
+                 or result['p99_latency'] > args.max_p99))
+    )
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""Поиск домашек, статус которых изменился с прошлого опроса."""
+from collections import OrderedDict, deque
+
+MAX_HOMEWORKS_PER_TENANT = 256
+MAX_HISTORY_PER_TENANT = 50
+
+
+class ChangeDetector:
+    """Последние известные записи домашек каждого студента.
+    Работает с проверенными записями records.Homework.
+    На студента хранится не больше max_per_tenant домашек,
+    самые давно обновлённые вытесняются первыми. Кроме того,
+    хранятся max_history последних изменений статуса: по ним
+    бот отвечает на команды без запроса к API.
+    """
+
+    def __init__(self, max_per_tenant=MAX_HOMEWORKS_PER_TENANT,
+                 max_history=MAX_HISTORY_PER_TENANT):
+        """Хранит ограниченное число записей на студента.
+        Не больше max_per_tenant домашек и max_history изменений.
+        """
+        self.max_per_tenant = max_per_tenant
+        self.max_history = max_history
+        self.known = {}
+        self.changes = {}
+
+    def is_changed(self, tenant_id, homework):
+        """Статус домашки отличается от известного."""
+        known = self.known.get(tenant_id, {}).get(homework.key)
+        return known is None or known.status != homework.status
+
+    def changed(self, tenant_id, homeworks):
+        """Домашки из ответа, статус которых отличается от известного.
+        Возвращаются от старых к новым: API отдаёт новые первыми.
+        """
+        return [
+            homework for homework in reversed(homeworks)
+            if self.is_changed(tenant_id, homework)
+        ]
+
+    def remember(self, tenant_id, homework):
+        """Запоминает статус домашки после отправки уведомления."""
+        known = self.known.setdefault(tenant_id, OrderedDict())
+        key = homework.key
+        known[key] = homework
+        known.move_to_end(key)
+        while len(known) > self.max_per_tenant:
+            known.popitem(last=False)
+        changes = self.changes.get(tenant_id)
+        if changes is None:
+            changes = deque(maxlen=self.max_history)
+            self.changes[tenant_id] = changes
+        changes.append(homework)
+
+    def statuses(self, tenant_id):
+        """Известные статусы домашек студента."""
+        return {
+            homework.status
+            for homework in self.known.get(tenant_id, {}).values()
+        }
+
+    def homeworks(self, tenant_id):
+        """Последние записи домашек студента, новые первыми."""
+        return list(self.known.get(tenant_id, {}).values())[::-1]
+
+    def history(self, tenant_id):
+        """Последние изменения статусов студента, новые первыми."""
+        return list(self.changes.get(tenant_id, ()))[::-1]
+
+    def forget(self, tenant_id):
+        """Удаляет всё, что известно о студенте."""
+        self.known.pop(tenant_id, None)
+        self.changes.pop(tenant_id, None)
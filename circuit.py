@@ -0,0 +1,105 @@
+"""Автоматический выключатель запросов к API Практикума."""
+import logging
+import threading
+import time
+from http import HTTPStatus
+
+from exceptions import (ExceptionCircuitOpen, ExceptionNonInspectedError,
+                        ExceptionNot200Error)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_endpoint_failure(error):
+    """Ошибка говорит о недоступности API, а не о проблеме студента.
+    Например, 401 из-за неверного токена одного студента не должен
+    выключать запросы для всех.
+    """
+    if isinstance(error, ExceptionNonInspectedError):
+        return True
+    if isinstance(error, ExceptionNot200Error):
+        return (
+            error.status_code is None
+            or error.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+            or error.status_code in (
+                HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS
+            )
+        )
+    return False
+
+
+class CircuitBreaker:
+    """Общий для всех студентов выключатель запросов к ENDPOINT.
+    После failure_threshold отказов подряд выключатель размыкается
+    и запросы сразу завершаются ExceptionCircuitOpen. Через
+    reset_timeout секунд пропускается до probes пробных запросов:
+    успех замыкает выключатель, отказ снова размыкает.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60, probes=1,
+                 clock=time.monotonic):
+        """Размыкается после failure_threshold ошибок подряд.
+        Через reset_timeout секунд пропускает probes пробных запросов.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.probes_in_flight = 0
+
+    def before_call(self):
+        """Разрешает запрос или выбрасывает ExceptionCircuitOpen."""
+        with self.lock:
+            if self.state == OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    raise ExceptionCircuitOpen('Practicum API is unavailable')
+                self.state = HALF_OPEN
+                self.probes_in_flight = 0
+                logger.info('Circuit breaker is half-open')
+            if self.state == HALF_OPEN:
+                if self.probes_in_flight >= self.probes:
+                    raise ExceptionCircuitOpen('Practicum API is probed')
+                self.probes_in_flight += 1
+
+    def record_success(self):
+        """Учитывает успешный запрос."""
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info('Circuit breaker is closed')
+            self.state = CLOSED
+            self.failures = 0
+            self.probes_in_flight = 0
+
+    def record_failure(self):
+        """Учитывает отказ API."""
+        with self.lock:
+            self.failures += 1
+            if (self.state == HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                if self.state != OPEN:
+                    logger.warning('Circuit breaker is open')
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self.probes_in_flight = 0
+
+    def call(self, func, *args):
+        """Вызывает func через выключатель."""
+        self.before_call()
+        try:
+            result = func(*args)
+        except Exception as error:
+            if is_endpoint_failure(error):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
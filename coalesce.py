@@ -0,0 +1,115 @@
+"""Склейка уведомлений одного чата в одно сообщение."""
+import time
+from collections import OrderedDict
+
+TELEGRAM_MAX_LENGTH = 4096
+SEPARATOR = '\n\n'
+
+
+def text_length(text):
+    """Длина текста так, как её считает Telegram: в единицах UTF-16."""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def fitting_prefix(text, max_length):
+    """Сколько первых символов текста помещается в max_length."""
+    length = 0
+    for position, char in enumerate(text):
+        length += 2 if ord(char) > 0xFFFF else 1
+        if length > max_length:
+            return max(position, 1)
+    return len(text)
+
+
+def split_text(text, max_length=TELEGRAM_MAX_LENGTH):
+    """Делит текст на куски не длиннее max_length.
+    Режет по последнему переводу строки, затем по пробелу и только
+    если их нет — посреди слова, но не посреди символа.
+    """
+    pieces = []
+    while text_length(text) > max_length:
+        cut = fitting_prefix(text, max_length)
+        skip = 0
+        for separator in ('\n', ' '):
+            position = text.rfind(separator, 0, cut)
+            if position > 0:
+                cut, skip = position, 1
+                break
+        pieces.append(text[:cut])
+        text = text[cut + skip:]
+    pieces.append(text)
+    return pieces
+
+
+def pack(texts, max_length=TELEGRAM_MAX_LENGTH, separator=SEPARATOR):
+    """Склеивает тексты в сообщения не длиннее max_length.
+    Возвращает пары (сообщение, номера вошедших в него текстов).
+    Текст режется, только если сам не помещается в сообщение.
+    """
+    parts = []
+    pieces, indices, length = [], [], 0
+    separator_length = text_length(separator)
+    for index, text in enumerate(texts):
+        for piece in split_text(text, max_length):
+            piece_length = text_length(piece)
+            if pieces and (
+                length + separator_length + piece_length > max_length
+            ):
+                parts.append((separator.join(pieces), indices))
+                pieces, indices, length = [], [], 0
+            if pieces:
+                length += separator_length
+            pieces.append(piece)
+            length += piece_length
+            if not indices or indices[-1] != index:
+                indices.append(index)
+    if pieces:
+        parts.append((separator.join(pieces), indices))
+    return parts
+
+
+class Coalescer:
+    """Копит уведомления по чатам и отдаёт их сводками.
+    Первое уведомление чата ждёт window секунд, всё, что пришло в
+    чат за это время, уходит вместе с ним. С window=0 склеиваются
+    уведомления одного опроса. Сводка длиннее max_length делится
+    на несколько сообщений.
+    """
+
+    def __init__(self, window=0, max_length=TELEGRAM_MAX_LENGTH,
+                 clock=time.monotonic):
+        """Сводка чата ждёт window секунд.
+        Сообщения не длиннее max_length.
+        """
+        self.window = window
+        self.max_length = max_length
+        self.clock = clock
+        self.pending = OrderedDict()
+
+    def __len__(self):
+        """Число накопленных уведомлений."""
+        return sum(len(texts) for _, texts in self.pending.values())
+
+    def add(self, chat_id, text):
+        """Добавляет уведомление в сводку чата."""
+        entry = self.pending.get(chat_id)
+        if entry is None:
+            self.pending[chat_id] = (self.clock() + self.window, [text])
+        else:
+            entry[1].append(text)
+
+    def due(self, force=False):
+        """Сообщения чатов, чьё окно закончилось: [(chat_id, текст)].
+        С force отдаются все накопленные уведомления.
+        """
+        now = self.clock()
+        messages = []
+        while self.pending:
+            chat_id, (deadline, texts) = next(iter(self.pending.items()))
+            if not force and deadline > now:
+                break
+            del self.pending[chat_id]
+            messages.extend(
+                (chat_id, text) for text, _ in pack(texts, self.max_length)
+            )
+        return messages
@@ -0,0 +1,134 @@
+"""Ответы на команды пользователей в Telegram."""
+import logging
+import threading
+
+from telegram.ext import CommandHandler, Updater
+
+from changes import ChangeDetector
+from messages import DEFAULT_CATALOG
+
+logger = logging.getLogger(__name__)
+
+
+class HistorySnapshot:
+    """Снимок студента, собранный из общей таблицы history.
+    Нужен процессу без движка опроса, например супервизору,
+    данные в который пишут воркеры.
+    """
+
+    def __init__(self, store):
+        """Изменения статусов читаются из store."""
+        self.store = store
+
+    def detector(self, tenant_id):
+        """Детектор изменений с записями одного студента."""
+        detector = ChangeDetector()
+        for homework in self.store.load(tenant_id):
+            detector.remember(tenant_id, homework)
+        return detector
+
+    def homeworks(self, tenant_id):
+        """Последние записи домашек студента, новые первыми."""
+        return self.detector(tenant_id).homeworks(tenant_id)
+
+    def history(self, tenant_id):
+        """Последние изменения статусов студента, новые первыми."""
+        return self.detector(tenant_id).history(tenant_id)
+
+
+class CommandServer:
+    """Отвечает на /status и /history из снимка snapshot.
+    Запросов к API нет: ответ собирается из последних записей
+    домашек студентов, привязанных к чату. snapshot — это
+    ChangeDetector движка опроса или HistorySnapshot. Обновления
+    Telegram забираются long polling в потоках Updater.
+    """
+
+    def __init__(self, tenants, snapshot, catalog=DEFAULT_CATALOG,
+                 token=None, updater=None, workers=4):
+        """Отвечает студентам tenants по снимку snapshot.
+        Updater по умолчанию создаётся из token.
+        """
+        self.snapshot = snapshot
+        self.catalog = catalog
+        self.updater = updater or Updater(
+            token=token, workers=workers, use_context=True
+        )
+        self.updater.dispatcher.add_handler(
+            CommandHandler('status', self.on_status)
+        )
+        self.updater.dispatcher.add_handler(
+            CommandHandler('history', self.on_history)
+        )
+        self.chats = {}
+        self.stopped = threading.Event()
+        self.refresh(tenants)
+
+    def refresh(self, tenants):
+        """Перестраивает индекс чат -> студенты."""
+        chats = {}
+        for tenant in tenants:
+            chats.setdefault(str(tenant.chat_id), []).append(tenant)
+        self.chats = chats
+
+    def watch(self, registry, interval):
+        """Перечитывает студентов из registry в фоновом потоке.
+        Нужно процессу без движка опроса: движок сам сообщает о новом
+        списке через tenant_listeners.
+        """
+        threading.Thread(
+            target=self.reload_loop,
+            args=(registry, interval),
+            name='commands-tenants',
+            daemon=True,
+        ).start()
+
+    def reload_loop(self, registry, interval):
+        """Раз в interval секунд перечитывает список до остановки."""
+        while not self.stopped.wait(interval):
+            self.reload(registry)
+
+    def reload(self, registry):
+        """Обновляет индекс чатов, если список студентов изменился."""
+        try:
+            diff = registry.reload()
+        except Exception:
+            logger.exception('Failed to reload tenants for commands')
+            return
+        if diff is not None and any(diff):
+            self.refresh(list(registry.tenants.values()))
+
+    def reply(self, chat_id, kind):
+        """Текст ответа для чата: текущие статусы или история."""
+        tenants = self.chats.get(str(chat_id), [])
+        homeworks = []
+        for tenant in tenants:
+            if kind == 'change':
+                homeworks.extend(self.snapshot.history(tenant.tenant_id))
+            else:
+                homeworks.extend(self.snapshot.homeworks(tenant.tenant_id))
+        locale = tenants[0].locale if tenants else None
+        return self.catalog.homework_list(homeworks, locale, kind)
+
+    def answer(self, update, kind):
+        """Отвечает на команду в тот же чат."""
+        chat_id = update.effective_chat.id
+        logger.info(f'Command {kind} from chat {chat_id}')
+        update.effective_message.reply_text(self.reply(chat_id, kind))
+
+    def on_status(self, update, context):
+        """Обработчик /status."""
+        self.answer(update, 'homework')
+
+    def on_history(self, update, context):
+        """Обработчик /history."""
+        self.answer(update, 'change')
+
+    def start(self):
+        """Начинает получать команды в фоновом потоке."""
+        self.updater.start_polling(drop_pending_updates=True)
+
+    def stop(self):
+        """Останавливает получение команд."""
+        self.stopped.set()
+        self.updater.stop()
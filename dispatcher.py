@@ -0,0 +1,162 @@
+"""Очередь исходящих сообщений в Telegram с ограничением частоты."""
+import asyncio
+import logging
+from collections import Counter
+
+from exceptions import ExceptionQueueFull
+from metrics import count_error
+from ratelimit import TokenBucket, wait_for_token
+
+logger = logging.getLogger(__name__)
+
+MAX_IDLE_CHAT_BUCKETS = 10000
+
+
+class OutboundDispatcher:
+    """Доставляет сообщения пулом воркеров, не задерживая опрос API.
+    Частота ограничена общей корзиной токенов и корзиной на каждый
+    чат. Сообщения одного чата всегда попадают к одному воркеру,
+    поэтому порядок их доставки сохраняется. Если передан outbox,
+    записи message_ids, из которых склеено сообщение, после отправки
+    отмечаются в нём доставленными, а при ошибке откладываются на
+    повтор. Запись, разрезанная на несколько сообщений, считается
+    доставленной, только когда отправлены все её части.
+    """
+
+    def __init__(self, deliver, workers=8, max_queue=10000,
+                 global_rate=30, chat_rate=1, chat_burst=3, outbox=None):
+        """Сообщения отправляет корутина deliver.
+        Воркеров workers, вместе их очереди держат max_queue
+        сообщений.
+        """
+        self.deliver = deliver
+        self.outbox = outbox
+        self.in_flight = set()
+        self.parts = Counter()
+        self.broken = set()
+        self.workers = workers
+        self.queue_size = max(max_queue // workers, 1)
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = {}
+        self.queues = []
+        self.tasks = []
+
+    def start(self):
+        """Запускает воркеры в текущем цикле событий."""
+        self.queues = [
+            asyncio.Queue(maxsize=self.queue_size)
+            for _ in range(self.workers)
+        ]
+        self.tasks = [
+            asyncio.ensure_future(self.worker(queue))
+            for queue in self.queues
+        ]
+
+    async def stop(self):
+        """Останавливает воркеры, не дожидаясь очереди."""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def join(self):
+        """Ждёт доставки всего, что уже поставлено в очередь."""
+        for queue in self.queues:
+            await queue.join()
+
+    def depth(self):
+        """Сколько сообщений ждёт отправки."""
+        return sum(queue.qsize() for queue in self.queues)
+
+    def free(self):
+        """Сколько ещё сообщений поместится в очереди."""
+        return sum(queue.maxsize - queue.qsize() for queue in self.queues)
+
+    def enqueue(self, chat_id, text, message_ids=()):
+        """Ставит сообщение в очередь, не дожидаясь отправки."""
+        self.enqueue_parts(chat_id, [(text, message_ids)])
+
+    def enqueue_parts(self, chat_id, parts):
+        """Ставит в очередь сообщения чата [(текст, message_ids)].
+        Если все не помещаются, не ставится ни одно: иначе запись
+        могла бы уйти без части текста.
+        """
+        queue = self.queues[hash(chat_id) % self.workers]
+        if queue.maxsize - queue.qsize() < len(parts):
+            raise ExceptionQueueFull(
+                f'Outbound queue is full, chat {chat_id}'
+            )
+        for text, message_ids in parts:
+            queue.put_nowait((chat_id, text, message_ids))
+            self.in_flight.update(message_ids)
+            self.parts.update(message_ids)
+
+    def finish(self, message_ids, ok):
+        """Учитывает отправку части записей message_ids.
+        Запись отмечается в outbox, когда закончились все её части:
+        доставленной, если ни одна не упала, иначе — на повтор.
+        """
+        for message_id in message_ids:
+            if not ok:
+                self.broken.add(message_id)
+            self.parts[message_id] -= 1
+            if self.parts[message_id] > 0:
+                continue
+            del self.parts[message_id]
+            self.in_flight.discard(message_id)
+            failed = message_id in self.broken
+            self.broken.discard(message_id)
+            self.mark(message_id, failed)
+
+    def mark(self, message_id, failed):
+        """Отмечает запись в outbox, не роняя воркер.
+        Если база занята, запись остаётся арендованной и по истечении
+        аренды отправляется снова.
+        """
+        try:
+            if failed:
+                self.outbox.failed(message_id)
+            else:
+                self.outbox.delivered(message_id)
+        except Exception as error:
+            count_error(error)
+            logger.exception(f'Failed to mark outbox message {message_id}')
+
+    def chat_bucket(self, chat_id):
+        """Корзина токенов чата, неиспользуемые корзины вычищаются."""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_IDLE_CHAT_BUCKETS:
+                self.chat_buckets = {
+                    chat: old for chat, old in self.chat_buckets.items()
+                    if not old.is_full()
+                }
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def worker(self, queue):
+        """Забирает сообщения из очереди и отправляет их."""
+        while True:
+            chat_id, text, message_ids = await queue.get()
+            try:
+                ok = await self.send(chat_id, text)
+                self.finish(message_ids, ok)
+            finally:
+                queue.task_done()
+
+    async def send(self, chat_id, text):
+        """Отправляет сообщение с учётом лимитов, True при успехе."""
+        try:
+            await wait_for_token(self.chat_bucket(chat_id))
+            await wait_for_token(self.global_bucket)
+            await self.deliver(chat_id, text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            count_error(error)
+            logger.exception(f'Failed to deliver a message to {chat_id}')
+            return False
+        return True
@@ -0,0 +1,628 @@
+"""Асинхронный опрос API сразу для множества студентов."""
+import asyncio
+import contextvars
+import functools
+import itertools
+import logging
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from aggregator import ErrorAggregator
+from changes import ChangeDetector
+from circuit import CircuitBreaker
+from coalesce import Coalescer, pack
+from dispatcher import OutboundDispatcher
+from exceptions import (BotException, ExceptionCircuitOpen,
+                        ExceptionListEmpty, ExceptionNonInspectedError,
+                        ExceptionNot200Error, ExceptionQueueFull,
+                        ExceptionResponseError, ExceptionStatusUnknown)
+from hedging import HedgedCaller
+from homework import (auth_headers, check_response, fetch_api_answer,
+                      send_message_to, stream_api_answer)
+from logconfig import request_id_var, tenant_id_var
+from messages import DEFAULT_CATALOG
+from metrics import (API_LATENCY, CHECK_RESPONSE_TIME, HEDGED_REQUESTS,
+                     LOOP_LAG, PARSE_STATUS_TIME, QUEUE_DEPTH,
+                     TELEGRAM_LATENCY, count_error)
+from ratelimit import TokenBucket, wait_for_token
+from records import Homework
+from scheduler import AdaptivePolicy, TimingWheel, phase_offset
+from settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class TenantState:
+    """Состояние опроса одного студента между итерациями."""
+
+    __slots__ = ('tenant', 'headers', 'from_date', 'reviewing',
+                 'idle_polls', 'failures')
+
+    def __init__(self, tenant, from_date):
+        """Опрос студента tenant начинается с отметки from_date."""
+        self.tenant = tenant
+        self.headers = auth_headers(tenant.practicum_token)
+        self.from_date = from_date
+        self.reviewing = False
+        self.idle_polls = 0
+        self.failures = 0
+
+
+class PollingEngine:
+    """Опрашивает API для всех студентов из одного процесса.
+    Блокирующие запросы выполняются в пуле потоков, число
+    одновременных опросов ограничено семафором. Сообщения только
+    ставятся в очередь dispatcher, опрос не ждёт их доставки.
+    """
+
+    def __init__(self, bot, tenants, concurrency=64, retry_time=None,
+                 session=None, watermarks=None, dispatcher=None,
+                 policy=None, api_budget=None, breaker=None,
+                 hedging=None, profiler=None, stream=None,
+                 catalog=DEFAULT_CATALOG, outbox=None, history=None,
+                 leases=None, errors=None, registry=None,
+                 reload_interval=None, coalescer=None,
+                 rate_share=1, owns_chat=None, settings=None):
+        """Необязательные зависимости создаются по settings.
+        Без settings берутся настройки, прочитанные при запуске.
+        """
+        settings = settings or get_settings()
+        self.settings = settings
+        retry_time = retry_time or settings.RETRY_TIME
+        self.bot = bot
+        # Без outbox уведомления чата склеивает coalescer, с outbox они
+        # склеиваются при выборке из журнала.
+        if coalescer is None:
+            coalescer = Coalescer(
+                window=settings.NOTIFY_WINDOW,
+                max_length=settings.NOTIFY_MAX_LENGTH,
+            )
+        self.coalescer = coalescer
+        # Список студентов перечитывается из registry раз в
+        # reload_interval секунд.
+        self.registry = registry
+        self.reload_interval = (
+            settings.TENANTS_RELOAD_INTERVAL if reload_interval is None
+            else reload_interval
+        )
+        self.tenant_listeners = []
+        # С leases опрашиваются только студенты, чью аренду держит узел.
+        self.leases = leases
+        self.errors = errors or ErrorAggregator(
+            window=settings.ERROR_WINDOW,
+            repeat_after=settings.ERROR_REPEAT_AFTER,
+        )
+        # Уведомления пишутся в outbox до сдвига from_date и
+        # доставляются оттуда с повторами. Процесс забирает из него
+        # только сообщения чатов, где owns_chat.
+        self.outbox = outbox
+        self.owns_chat = owns_chat
+        self.next_renew = 0
+        self.catalog = catalog
+        self.stream = settings.STREAM_RESPONSES if stream is None else stream
+        self.profiler = profiler
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.BREAKER_FAILURES,
+            reset_timeout=settings.BREAKER_RESET_TIME,
+            probes=settings.BREAKER_PROBES,
+        )
+        self.policy = policy or AdaptivePolicy(
+            base=retry_time,
+            reviewing=settings.REVIEWING_RETRY_TIME,
+            idle_max=settings.IDLE_MAX_RETRY_TIME,
+            error_base=settings.ERROR_RETRY_TIME,
+            error_max=settings.ERROR_MAX_RETRY_TIME,
+        )
+        # Процессу достаётся доля rate_share общих лимитов API и Telegram.
+        self.api_budget = api_budget or TokenBucket(
+            settings.API_REQUESTS_PER_SECOND * rate_share
+        )
+        if hedging is None and settings.HEDGE_REQUESTS:
+            hedging = HedgedCaller(
+                percentile=settings.HEDGE_PERCENTILE,
+                min_delay=settings.HEDGE_MIN_DELAY,
+                budget=self.api_budget,
+            )
+        self.hedging = hedging
+        self.dispatcher = dispatcher or OutboundDispatcher(
+            self.deliver,
+            workers=settings.SEND_WORKERS,
+            max_queue=settings.SEND_QUEUE_SIZE,
+            global_rate=settings.TELEGRAM_GLOBAL_RATE * rate_share,
+            chat_rate=settings.TELEGRAM_CHAT_RATE,
+            outbox=outbox,
+        )
+        self.session = session or requests
+        self.watermarks = watermarks
+        self.retry_time = retry_time
+        saved = watermarks.load_all() if watermarks is not None else {}
+        start = int(time.time()) - retry_time
+        self.states = [
+            TenantState(tenant, saved.get(tenant.tenant_id, start))
+            for tenant in tenants
+        ]
+        self.by_tenant = {
+            state.tenant.tenant_id: state for state in self.states
+        }
+        for tenant in tenants:
+            if tenant.template:
+                catalog.custom_template(tenant.template)
+        self.concurrency = concurrency
+        # Проигравший дублирующий запрос держит поток до ответа, а
+        # отправка в Telegram идёт через тот же пул.
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency * (2 if hedging is not None else 1)
+            + self.dispatcher.workers
+        )
+        self.semaphore = None
+        self.changes = ChangeDetector()
+        # Изменения статусов из history восстанавливаются в снимок
+        # changes после перезапуска.
+        self.history = history
+        self.unsaved = []
+        if history is not None:
+            history.trim(self.changes.max_per_tenant)
+            polled = {tenant.tenant_id for tenant in tenants}
+            for tenant_id, homework in history.load_all():
+                if tenant_id in polled:
+                    self.changes.remember(tenant_id, homework)
+        self.wheel = TimingWheel()
+        self.request_ids = itertools.count(1)
+        self.tasks = set()
+
+    async def call(self, func, *args):
+        """Выполняет блокирующую функцию в пуле потоков.
+        Контекст (id студента и запроса для логов) переносится в поток.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(context.run, func, *args)
+        )
+
+    async def deliver(self, chat_id, message):
+        """Отправляет сообщение в Telegram из пула потоков."""
+        with TELEGRAM_LATENCY.time():
+            await self.call(send_message_to, self.bot, chat_id, message)
+
+    def send(self, state, message, key=None):
+        """Добавляет сообщение для студента в сводку его чата.
+        С outbox сообщение только записывается в журнал, key не даёт
+        записать одно и то же уведомление дважды.
+        """
+        if self.outbox is None:
+            self.coalescer.add(state.tenant.chat_id, message)
+        else:
+            self.outbox.add(state.tenant.chat_id, message, key)
+
+    def release(self, force=False):
+        """Ставит в очередь отправки сводки, чьё окно закончилось."""
+        for chat_id, text in self.coalescer.due(force):
+            try:
+                self.dispatcher.enqueue(chat_id, text)
+            except ExceptionQueueFull as error:
+                count_error(error)
+                logger.error(str(error))
+
+    async def drain(self):
+        """Передаёт созревшие сообщения в очередь отправки.
+        Сообщения одного чата из outbox склеиваются в сводки. Чаты,
+        которым не хватило места в очереди, сразу возвращаются в outbox.
+        """
+        if self.outbox is None:
+            self.release()
+            return
+        await self.call(self.outbox.flush)
+        await self.renew_claims()
+        due = await self.call(
+            self.outbox.claim,
+            min(self.settings.OUTBOX_BATCH, self.dispatcher.free()),
+            frozenset(self.dispatcher.in_flight),
+            self.owns_chat,
+        )
+        by_chat = {}
+        for message_id, chat_id, text in due:
+            by_chat.setdefault(chat_id, []).append((message_id, text))
+        skipped = []
+        for chat_id, messages in by_chat.items():
+            parts = pack(
+                [text for _, text in messages], self.coalescer.max_length
+            )
+            try:
+                self.dispatcher.enqueue_parts(chat_id, [
+                    (text, [messages[i][0] for i in indices])
+                    for text, indices in parts
+                ])
+            except ExceptionQueueFull:
+                skipped.extend(message_id for message_id, _ in messages)
+        if skipped:
+            await self.call(self.outbox.release, skipped)
+
+    async def renew_claims(self):
+        """Продлевает аренду сообщений, которые ещё ждут в очереди.
+        Иначе сообщение, застрявшее за ограничением частоты дольше
+        аренды, заберёт и отправит второй раз другой процесс.
+        """
+        now = time.monotonic()
+        if not self.dispatcher.in_flight or now < self.next_renew:
+            return
+        await self.call(self.outbox.renew, list(self.dispatcher.in_flight))
+        self.next_renew = now + self.outbox.lease / 3
+
+    async def report_errors(self):
+        """Отправляет сводки ошибок, если окно закончилось."""
+        for tenant_id, lines in self.errors.collect().items():
+            state = self.by_tenant.get(tenant_id)
+            if state is None:
+                continue
+            message = self.catalog.error_digest(
+                lines, self.errors.window, state.tenant.locale
+            )
+            try:
+                self.send(state, message)
+            except BotException as send_error:
+                count_error(send_error)
+                logger.exception('Failed to report errors to Telegram')
+        if self.outbox is None:
+            self.release()
+
+    async def fetch(self, state):
+        """Запрашивает API для студента через breaker и hedging."""
+        def make_call():
+            if self.stream:
+                return self.call(
+                    self.breaker.call,
+                    stream_api_answer,
+                    state.headers,
+                    state.from_date,
+                    self.session,
+                    functools.partial(
+                        self.changes.is_changed, state.tenant.tenant_id
+                    ),
+                    self.settings.STREAM_MAX_HOMEWORKS,
+                    self.record,
+                )
+            return self.call(
+                self.breaker.call,
+                fetch_api_answer,
+                state.headers,
+                state.from_date,
+                self.session,
+            )
+
+        with API_LATENCY.time():
+            if self.hedging is None:
+                return await make_call()
+            return await self.hedging.run(make_call)
+
+    def record(self, homework):
+        """Проверенная запись домашки или None для некорректной.
+        Одна сломанная домашка не должна блокировать остальные.
+        """
+        if isinstance(homework, Homework):
+            return homework
+        try:
+            return Homework.from_dict(homework)
+        except (ExceptionResponseError, ExceptionStatusUnknown) as error:
+            count_error(error)
+            logger.error(f'Skipped an invalid homework: {error!r}')
+            return None
+
+    def remember(self, tenant_id, homework):
+        """Запоминает изменение статуса в снимке.
+        В history оно попадает только в persist(), после уведомления.
+        """
+        self.changes.remember(tenant_id, homework)
+        if self.history is not None:
+            self.unsaved.append((tenant_id, homework))
+
+    async def persist(self):
+        """Сохраняет уведомления в outbox, а после них изменения в history.
+        Иначе после падения статус из history считался бы отправленным.
+        """
+        unsaved, self.unsaved = self.unsaved, []
+        try:
+            if self.outbox is not None:
+                await self.call(self.outbox.flush)
+            if unsaved:
+                await self.call(self.history.add_many, unsaved)
+        except Exception:
+            self.unsaved = unsaved + self.unsaved
+            raise
+
+    async def advance(self, state, response):
+        """Запоминает current_date из ответа как новую отметку.
+        Уведомления и history сохраняются на диск раньше отметки.
+        """
+        await self.persist()
+        current_date = response.get('current_date')
+        if not isinstance(current_date, int):
+            return
+        if current_date <= state.from_date:
+            return
+        state.from_date = current_date
+        if self.watermarks is not None:
+            await self.call(
+                self.watermarks.advance, state.tenant.tenant_id, current_date
+            )
+
+    async def poll_tenant(self, state):
+        """Одна итерация опроса.
+        Уведомления по всем домашкам с изменившимся статусом уходят
+        в чат одной сводкой, ошибки попадают в сводку errors.
+        """
+        tenant_id = state.tenant.tenant_id
+        tenant_id_var.set(tenant_id)
+        request_id_var.set(f'{next(self.request_ids):x}')
+        try:
+            async with self.semaphore:
+                await wait_for_token(self.api_budget)
+                response = await self.fetch(state)
+            if not self.is_polled(state):
+                return
+            with CHECK_RESPONSE_TIME.time():
+                homeworks = check_response(response)
+            if not homeworks:
+                logger.info('Список работ пустой')
+            records = [
+                record for record in map(self.record, homeworks)
+                if record is not None
+            ]
+            changed = self.changes.changed(tenant_id, records)
+            for homework in changed:
+                with PARSE_STATUS_TIME.time():
+                    message = self.catalog.status_message(
+                        homework, state.tenant.locale, state.tenant.template
+                    )
+                self.send(state, message, key=(
+                    f'{tenant_id}:{homework.key}:'
+                    f'{homework.status}:{homework.date}'
+                ))
+                self.remember(tenant_id, homework)
+            if changed and self.outbox is None:
+                self.release()
+            state.failures = 0
+            state.idle_polls = 0 if changed else state.idle_polls + 1
+            state.reviewing = 'reviewing' in self.changes.statuses(tenant_id)
+            await self.advance(state, response)
+
+        except ExceptionListEmpty as e:
+            logger.info(str(e))
+
+        except ExceptionCircuitOpen as e:
+            count_error(e)
+            logger.info(f'Tenant {tenant_id} skipped: {e}')
+
+        except BotException as error:
+            count_error(error)
+            if isinstance(
+                error, (ExceptionNot200Error, ExceptionNonInspectedError)
+            ):
+                state.failures += 1
+            self.errors.record(tenant_id, error)
+            logger.exception(f'Error: {error}!!!')
+
+    def owns(self, state):
+        """Этот узел опрашивает студента."""
+        return self.leases is None or self.leases.owns(state.tenant.tenant_id)
+
+    def adopt(self, state):
+        """Подхватывает студента, полученного от другого узла.
+        Отметка и известные статусы берутся из общего хранилища,
+        чтобы не повторять уже отправленные уведомления.
+        """
+        tenant_id = state.tenant.tenant_id
+        if self.watermarks is not None:
+            state.from_date = max(
+                state.from_date, self.watermarks.get(tenant_id, 0)
+            )
+        if self.history is not None:
+            self.changes.forget(tenant_id)
+            for homework in self.history.load(tenant_id):
+                self.changes.remember(tenant_id, homework)
+
+    async def keep_leases(self):
+        """Продлевает аренду студентов и подхватывает новых."""
+        owned = set()
+        while True:
+            try:
+                current = await self.call(self.leases.heartbeat)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                count_error(error)
+                logger.exception('Failed to renew tenant leases')
+            else:
+                for tenant_id in current - owned:
+                    state = self.by_tenant.get(tenant_id)
+                    if state is not None:
+                        self.adopt(state)
+                owned = current
+            await asyncio.sleep(self.leases.renew_interval)
+
+    async def poll_and_reschedule(self, state):
+        """Опрашивает студента и ставит следующий опрос в колесо.
+        Опрос удалённого из списка студента пропускается.
+        """
+        if not self.is_polled(state):
+            return
+        try:
+            if self.owns(state):
+                await self.poll_tenant(state)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            count_error(error)
+            logger.exception(
+                f'Unexpected error for tenant {state.tenant.tenant_id}'
+            )
+        if self.is_polled(state):
+            self.wheel.schedule(state, self.policy.next_interval(state))
+
+    def is_polled(self, state):
+        """Студент всё ещё в списке опрашиваемых."""
+        return self.by_tenant.get(state.tenant.tenant_id) is state
+
+    def add_tenant(self, tenant):
+        """Начинает опрашивать нового студента."""
+        tenant_id = tenant.tenant_id
+        from_date = int(time.time()) - self.retry_time
+        if self.watermarks is not None:
+            from_date = self.watermarks.get(tenant_id, from_date)
+        state = TenantState(tenant, from_date)
+        if tenant.template:
+            self.catalog.custom_template(tenant.template)
+        self.states.append(state)
+        self.by_tenant[tenant_id] = state
+        if self.history is not None:
+            for homework in self.history.load(tenant_id):
+                self.changes.remember(tenant_id, homework)
+        self.wheel.schedule(state, phase_offset(tenant_id, self.retry_time))
+
+    def remove_tenant(self, tenant_id):
+        """Перестаёт опрашивать студента.
+        Запланированный опрос не выполняется и не переносится, ответ
+        на уже отправленный запрос отбрасывается.
+        """
+        state = self.by_tenant.pop(tenant_id)
+        self.states.remove(state)
+        self.changes.forget(tenant_id)
+
+    def update_tenant(self, tenant):
+        """Меняет настройки студента, расписание опросов сохраняется."""
+        state = self.by_tenant[tenant.tenant_id]
+        if tenant.practicum_token != state.tenant.practicum_token:
+            state.headers = auth_headers(tenant.practicum_token)
+        if tenant.template:
+            self.catalog.custom_template(tenant.template)
+        state.tenant = tenant
+
+    def apply_tenants(self, diff):
+        """Применяет разницу списков студентов и сообщает слушателям."""
+        for tenant in diff.removed:
+            self.remove_tenant(tenant.tenant_id)
+        for tenant in diff.updated:
+            self.update_tenant(tenant)
+        for tenant in diff.added:
+            self.add_tenant(tenant)
+        logger.info(
+            f'Tenants reloaded: {len(diff.added)} added, '
+            f'{len(diff.removed)} removed, {len(diff.updated)} updated, '
+            f'polling {len(self.states)} tenants'
+        )
+        tenants = [state.tenant for state in self.states]
+        for listener in self.tenant_listeners:
+            listener(tenants)
+
+    async def watch_tenants(self):
+        """Перечитывает список студентов, когда меняется источник.
+        Если источник не читается, остаётся прежний список.
+        """
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                diff = await self.call(self.registry.reload)
+                if diff is None or not any(diff):
+                    continue
+                self.apply_tenants(diff)
+                if self.leases is not None:
+                    await self.call(
+                        self.leases.set_tenants, list(self.by_tenant)
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                count_error(error)
+                logger.exception('Failed to reload tenants')
+
+    def background(self, coroutine):
+        """Запускает задачу, которая отменяется при остановке."""
+        task = asyncio.ensure_future(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def spawn(self, state):
+        """Запускает опрос студента отдельной задачей."""
+        self.background(self.poll_and_reschedule(state))
+
+    async def drive(self):
+        """Крутит колесо таймеров и запускает наступившие опросы."""
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += self.wheel.tick
+            await asyncio.sleep(max(0, next_tick - loop.time()))
+            LOOP_LAG.observe(max(0, loop.time() - next_tick))
+            if self.profiler is not None:
+                self.profiler.tick()
+            for state in self.wheel.advance():
+                self.spawn(state)
+            try:
+                await self.report_errors()
+                await self.drain()
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                count_error(error)
+                logger.exception('Failed to drain the outbox')
+
+    def start(self):
+        """Готовит движок к работе в текущем цикле событий."""
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.dispatcher.start()
+        if self.outbox is not None:
+            self.outbox.purge(self.settings.OUTBOX_RETENTION)
+        QUEUE_DEPTH.set_function(self.dispatcher.depth)
+        if self.hedging is not None:
+            for kind in self.hedging.stats:
+                HEDGED_REQUESTS.labels(kind).set_function(
+                    lambda kind=kind: self.hedging.stats[kind]
+                )
+        if self.profiler is not None and hasattr(signal, 'SIGUSR2'):
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGUSR2, self.profiler.request
+            )
+
+    async def stop(self):
+        """Останавливает опросы, отправку и освобождает ресурсы."""
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.dispatcher.stop()
+        await self.persist()
+        if self.profiler is not None and self.profiler.profiler is not None:
+            self.profiler.finish()
+        if self.leases is not None:
+            await self.call(self.leases.release)
+        self.executor.shutdown(wait=False)
+        if self.session is not requests:
+            self.session.close()
+
+    async def run(self):
+        """Запускает опрос всех студентов и ждёт его завершения.
+        SIGTERM отменяет опрос, и движок останавливается как при
+        любом другом завершении: сохраняет буферы и закрывает сессию.
+        """
+        self.start()
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel
+            )
+        except NotImplementedError:
+            pass
+        for state in self.states:
+            self.wheel.schedule(
+                state, phase_offset(state.tenant.tenant_id, self.retry_time)
+            )
+        logger.info(f'Polling {len(self.states)} tenants')
+        if self.leases is not None:
+            self.background(self.keep_leases())
+        if self.registry is not None:
+            self.background(self.watch_tenants())
+        try:
+            await self.drive()
+        finally:
+            await self.stop()
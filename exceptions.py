@@ -5,6 +5,11 @@ class BotException(Exception):
 class ExceptionNot200Error(BotException):
     """Запрос не вернул ответ с кодом 200."""
 
+    def __init__(self, message='', status_code=None):
+        """status_code — код ответа API, если он был."""
+        super().__init__(message)
+        self.status_code = status_code
+
 
 class ExceptionTelegram(BotException):
     """Сообщение не отправилось в чат."""
@@ -21,5 +26,14 @@ class ExceptionListEmpty(BotException):
 class ExceptionStatusUnknown(KeyError):
     """Неизвестный статус домашней работы."""
 
+
 class ExceptionNonInspectedError(BotException):
     """Прочие ошибки."""
+
+
+class ExceptionQueueFull(BotException):
+    """Очередь исходящих сообщений переполнена."""
+
+
+class ExceptionCircuitOpen(BotException):
+    """API недоступен, запросы временно не отправляются."""
@@ -1,53 +1,68 @@
-"""Бот для проверки домашки."""
+"""Бот для проверки домашки.
+Импорт модуля не имеет побочных эффектов: .env читается и логи
+настраиваются только в main(), а requests, telegram и прочие
+тяжёлые зависимости импортируются при первом использовании.
+"""
 import os
 import sys
 import time
 import logging
 from http import HTTPStatus
 
-import requests
-import telegram
-
-from dotenv import load_dotenv
-
-from exceptions import (BotException, ExceptionNot200Error, ExceptionTelegram,
-                        ExceptionResponseError, ExceptionListEmpty,
-                        ExceptionNonInspectedError, ExceptionStatusUnknown)
-
-load_dotenv()
-
+from exceptions import (ExceptionNot200Error, ExceptionTelegram,
+                        ExceptionResponseError, ExceptionNonInspectedError)
+from messages import CATALOGUE, DEFAULT_CATALOG, DEFAULT_LOCALE
+from metrics import API_RESPONSE_SIZE
+from records import Homework
+from settings import get_settings, load_settings
+from streaming import StreamingObjectParser
+from tenants import Tenant, TenantRegistry, load_tenants, load_tenants_db
+
+# Токены одного студента для get_api_answer, send_message и check_tokens.
+# Бот берёт все настройки из settings.get_settings().
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
-RETRY_TIME = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-HOMEWORK_STATUSES = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+HOMEWORK_STATUSES = CATALOGUE[DEFAULT_LOCALE]['verdicts']
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s'
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-streamHandler = logging.StreamHandler(sys.stdout)
-logger.addHandler(streamHandler)
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-streamHandler.setFormatter(formatter)
+
+
+def __getattr__(name):
+    """RETRY_TIME остаётся атрибутом модуля и берётся из настроек."""
+    if name == 'RETRY_TIME':
+        return get_settings().RETRY_TIME
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def create_bot(token, base_url=None):
+    """Создаёт бота с пулом соединений на всех воркеров отправки."""
+    import telegram
+    from telegram.utils.request import Request
+
+    return telegram.Bot(
+        token=token,
+        base_url=base_url,
+        request=Request(con_pool_size=get_settings().SEND_WORKERS),
+    )
 
 
 def send_message(bot, message):
     """Отправляет сообщение в Telegram чат."""
+    send_message_to(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_message_to(bot, chat_id, message):
+    """Отправляет сообщение в указанный Telegram чат."""
+    import telegram
+
     try:
         logger.info('The bot started sending a message')
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+        bot.send_message(chat_id=chat_id, text=message)
     except telegram.TelegramError:
         raise ExceptionTelegram
     else:
@@ -56,21 +71,122 @@ def send_message(bot, message):
 
 def get_api_answer(current_timestamp):
     """Делает запрос к единственному эндпоинту API-сервиса."""
+    return fetch_api_answer(HEADERS, current_timestamp)
+
+
+def auth_headers(practicum_token):
+    """Заголовки авторизации для токена студента."""
+    return {'Authorization': f'OAuth {practicum_token}'}
+
+
+def create_session(pool_connections=None, pool_maxsize=None):
+    """Создаёт сессию с пулом keep-alive соединений.
+    pool_connections - число хостов, для которых держится пул,
+    pool_maxsize - число соединений к одному хосту.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    settings = get_settings()
+    pool_connections = pool_connections or settings.POOL_CONNECTIONS
+    pool_maxsize = pool_maxsize or settings.POOL_MAXSIZE
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=True,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def request_api(headers, current_timestamp, session=None, **kwargs):
+    """Отправляет запрос к API и проверяет код ответа.
+    Без session запрос идёт через сам модуль requests.
+    """
+    import requests
+
+    settings = get_settings()
+    session = session or requests
     timestamp = current_timestamp or int(time.time())
     params = {'from_date': timestamp}
     try:
         logger.info('Work has begun on the API request.')
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        response = session.get(
+            ENDPOINT,
+            headers=headers,
+            params=params,
+            timeout=(settings.API_CONNECT_TIMEOUT, settings.API_READ_TIMEOUT),
+            **kwargs,
+        )
     except requests.exceptions.RequestException as request_error:
         message = f'Код ответа API (RequestException): {request_error}'
         raise ExceptionNonInspectedError(message)
     if response.status_code != HTTPStatus.OK:
         message = 'The request page is unavailable! Repeat later!'
-        raise ExceptionNot200Error(message)
+        raise ExceptionNot200Error(message, response.status_code)
     logger.info('Request completed successfully.')
+    return response
+
+
+def fetch_api_answer(headers, current_timestamp, session=None):
+    """Делает запрос к API от имени конкретного студента.
+    session - сессия с пулом соединений или сам модуль requests.
+    """
+    response = request_api(headers, current_timestamp, session)
+    content = getattr(response, 'content', None)
+    if content is not None:
+        API_RESPONSE_SIZE.observe(len(content))
     return response.json()
 
 
+def stream_api_answer(headers, current_timestamp, session=None,
+                      keep=None, limit=None, convert=None):
+    """Потоковый вариант fetch_api_answer.
+    Домашки разбираются по одной и, если передан convert, сразу
+    превращаются в записи (None означает пропуск). В ответ попадают
+    только те, для которых keep(homework) истинно. После limit домашек
+    чтение прекращается. current_date приходит после списка домашек,
+    поэтому тогда вместо него возвращается время начала запроса:
+    иначе отметка не сдвинется и следующий опрос снова упрётся в limit.
+    """
+    import requests
+
+    started = int(time.time())
+    response = request_api(headers, current_timestamp, session, stream=True)
+    parser = StreamingObjectParser(
+        response.iter_content(get_settings().STREAM_CHUNK_SIZE), 'homeworks'
+    )
+    homeworks = []
+    stopped = False
+    try:
+        for number, homework in enumerate(parser.items(), 1):
+            if convert is not None:
+                homework = convert(homework)
+            if homework is not None and (keep is None or keep(homework)):
+                homeworks.append(homework)
+            if limit and number >= limit:
+                stopped = True
+                break
+    except requests.exceptions.RequestException as request_error:
+        message = f'Код ответа API (RequestException): {request_error}'
+        raise ExceptionNonInspectedError(message)
+    except ValueError as error:
+        raise ExceptionResponseError(f'Invalid JSON in the response: {error}')
+    finally:
+        response.close()
+    API_RESPONSE_SIZE.observe(parser.bytes_read)
+    if not parser.found_array:
+        message = 'There is no "homework" key in the response'
+        raise ExceptionResponseError(message)
+    answer = dict(parser.values)
+    answer['homeworks'] = homeworks
+    if stopped:
+        answer.setdefault('current_date', started)
+    return answer
+
+
 def check_response(response):
     """
     Проверяет ответ API на корректность.
@@ -100,17 +216,11 @@ def check_response(response):
 def parse_status(homework):
     """Извлекает из информации о конкретной.
     домашней работе статус этой работы.
+    Принимает словарь из ответа API или уже проверенную запись Homework.
     """
-    homework_status = homework.get('status')
-    if homework_status not in HOMEWORK_STATUSES:
-        message = 'Status hw unknown!'
-        raise ExceptionStatusUnknown(message)
-    homework_name = homework.get('homework_name')
-    if 'homework_name' not in homework:
-        message = 'Homework unknown!'
-        raise ExceptionStatusUnknown(message)
-    verdict = HOMEWORK_STATUSES[homework_status]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    if not isinstance(homework, Homework):
+        homework = Homework.from_dict(homework)
+    return DEFAULT_CATALOG.status_message(homework)
 
 
 def check_tokens():
@@ -120,47 +230,259 @@ def check_tokens():
     return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
 
 
+def tenant_registry(settings, select=None):
+    """Перечитываемый список студентов из TENANTS_DB или TENANTS_FILE.
+    Без них студент один, из переменных окружения, и возвращается None.
+    """
+    if settings.TENANTS_DB:
+        return TenantRegistry(settings.TENANTS_DB, load_tenants_db, select)
+    if settings.TENANTS_FILE:
+        return TenantRegistry(settings.TENANTS_FILE, load_tenants, select)
+    return None
+
+
+def load_configured_tenants(settings):
+    """Студенты из TENANTS_DB, TENANTS_FILE или из переменных окружения."""
+    registry = tenant_registry(settings)
+    if registry is not None:
+        return registry.load()
+    return [
+        Tenant('default', settings.PRACTICUM_TOKEN, settings.TELEGRAM_CHAT_ID)
+    ]
+
+
 def main():
     """Основная логика работы бота."""
-    message = ''
+    from logconfig import setup_logging
+
+    settings = load_settings()
+    listener = setup_logging(
+        json_format=settings.LOG_JSON, sample_rate=settings.LOG_SAMPLE_RATE
+    )
+    try:
+        if settings.WORKERS > 1:
+            run_supervisor(settings)
+        else:
+            run_bot(settings)
+    finally:
+        listener.stop()
+
+
+def check_settings(settings):
+    """Завершает программу, если не хватает токенов."""
     logger.debug('start check tokens:')
-    if not check_tokens():
+    if settings.TENANTS_DB or settings.TENANTS_FILE:
+        tokens_found = bool(settings.TELEGRAM_TOKEN)
+    else:
+        tokens_found = all((
+            settings.PRACTICUM_TOKEN,
+            settings.TELEGRAM_TOKEN,
+            settings.TELEGRAM_CHAT_ID,
+        ))
+    if not tokens_found:
         logger.critical('Tokens is not found!')
         message = 'The program has failed, there are no tokens!'
         sys.exit(message)
     logger.debug('tokens correct!')
 
-    last_message = ''
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-
-    while True:
-        try:
-            current_timestamp = int(time.time()) - RETRY_TIME
-
-            response = get_api_answer(current_timestamp)
-            logger.debug('get_api_answer is good.')
-
-            homeworks = check_response(response)
-            if homeworks:
-                message = parse_status(homeworks[0])
-            else:
-                logger.info('Список работ пустой')
-
-            if message != last_message:
-                send_message(bot, message)
-                last_message = message
-
-        except ExceptionListEmpty as e:
-            logger.info(str(e))
-
-        except BotException as error:
-            message = f'Ошибка в программе: {str(error)}'
-            logger.exception(f'Error: {message}!!!')
-            if message != last_message:
-                send_message(bot, message)
-                last_message = message
-        finally:
-            time.sleep(RETRY_TIME)
+
+def run_supervisor(settings):
+    """Запускает WORKERS процессов опроса и следит за ними.
+    Студенты делятся между воркерами консистентным хешированием,
+    на команды отвечает сам супервизор по общей таблице history и
+    перечитываемому списку студентов.
+    """
+    from supervisor import Supervisor
+
+    check_settings(settings)
+    commands = None
+    if settings.BOT_COMMANDS:
+        from commands import CommandServer, HistorySnapshot
+        from storage import HistoryStore
+
+        registry = tenant_registry(settings)
+        commands = CommandServer(
+            registry.load() if registry is not None
+            else load_configured_tenants(settings),
+            HistorySnapshot(HistoryStore(settings.STATE_DB)),
+            DEFAULT_CATALOG,
+            settings.TELEGRAM_TOKEN,
+        )
+        if registry is not None:
+            commands.watch(registry, settings.TENANTS_RELOAD_INTERVAL)
+        commands.start()
+    try:
+        Supervisor(run_worker, settings.WORKERS).run()
+    finally:
+        if commands is not None:
+            commands.stop()
+
+
+def run_worker(index, workers):
+    """Точка входа дочернего процесса супервизора."""
+    from logconfig import setup_logging
+    from supervisor import reset_worker_signals
+
+    def terminate(signum, frame):
+        sys.exit(0)
+
+    reset_worker_signals(terminate)
+    settings = get_settings()
+    listener = setup_logging(
+        json_format=settings.LOG_JSON, sample_rate=settings.LOG_SAMPLE_RATE
+    )
+    try:
+        run_bot(settings, shard=(index, workers))
+    finally:
+        listener.stop()
+
+
+def worker_tenants(settings, shard=None):
+    """Реестр студентов и студенты, которых опрашивает этот процесс.
+    Без LEASES воркер супервизора берёт только свою долю студентов.
+    """
+    from supervisor import shard as select_shard
+
+    select = None
+    if shard is not None and not settings.LEASES:
+        def select(tenants):
+            return select_shard(tenants, *shard)
+
+    registry = tenant_registry(settings, select)
+    if registry is not None:
+        return registry, registry.load()
+    tenants = load_configured_tenants(settings)
+    if select is not None:
+        tenants = select(tenants)
+    return None, tenants
+
+
+def worker_limits(shard=None):
+    """Доля общих лимитов процесса и проверка, его ли это чат.
+    Воркеры делят лимиты поровну, а чаты — консистентным хешированием,
+    чтобы сообщения одного чата отправлял один процесс по порядку.
+    """
+    if shard is None:
+        return 1, None
+    from supervisor import HashRing
+
+    index, workers = shard
+    ring = HashRing(range(workers))
+
+    def owns_chat(chat_id):
+        return ring.node(chat_id) == index
+
+    return 1 / workers, owns_chat
+
+
+def create_leases(settings, tenants, shard=None):
+    """Аренда студентов в LEASE_DB для этого узла."""
+    import socket
+
+    from leases import LeaseManager
+    from storage import LeaseStore
+
+    node_id = settings.NODE_ID or f'{socket.gethostname()}-{os.getpid()}'
+    if shard is not None:
+        node_id = f'{node_id}-{shard[0]}'
+    return LeaseManager(
+        LeaseStore(settings.LEASE_DB),
+        node_id,
+        [tenant.tenant_id for tenant in tenants],
+        ttl=settings.LEASE_TTL,
+    )
+
+
+def create_commands(settings, tenants, engine):
+    """Ответы на команды для процесса с движком опроса.
+    С LEASES снимок движка знает только своих студентов, поэтому
+    ответ собирается из общей таблицы history.
+    """
+    from commands import CommandServer, HistorySnapshot
+
+    snapshot = engine.changes
+    if settings.LEASES:
+        snapshot = HistorySnapshot(engine.history)
+    commands = CommandServer(
+        tenants, snapshot, engine.catalog, settings.TELEGRAM_TOKEN
+    )
+    engine.tenant_listeners.append(commands.refresh)
+    return commands
+
+
+def run_bot(settings=None, shard=None):
+    """Проверяет настройки и запускает опрос всех студентов.
+    shard - пара (номер воркера, число воркеров): опрашиваются
+    только студенты этого воркера. С LEASES студенты делятся между
+    всеми узлами и воркерами через аренду в LEASE_DB. Список из
+    TENANTS_DB или TENANTS_FILE перечитывается на ходу.
+    """
+    import asyncio
+
+    from engine import PollingEngine
+    from profiling import LoopProfiler
+    from storage import HistoryStore, OutboxStore, WatermarkStore
+
+    settings = settings or get_settings()
+    check_settings(settings)
+    registry, tenants = worker_tenants(settings, shard)
+    metrics_port = settings.METRICS_PORT
+    if shard is not None and metrics_port:
+        metrics_port += shard[0]
+    if metrics_port:
+        from metrics import start_metrics_server
+
+        start_metrics_server(metrics_port)
+    bot = create_bot(settings.TELEGRAM_TOKEN)
+    profiler = LoopProfiler(
+        settings.PROFILE_DIR,
+        settings.PROFILE_ITERATIONS or 60,
+        settings.PROFILE_MODE,
+    )
+    if settings.PROFILE_ITERATIONS:
+        profiler.request()
+    session = create_session()
+    if settings.RECORD_FILE:
+        from replay import Recorder, RecordingSession
+
+        path = settings.RECORD_FILE
+        if shard is not None:
+            path = f'{path}.{shard[0]}'
+        session = RecordingSession(session, Recorder(path))
+    leases = None
+    if settings.LEASES:
+        leases = create_leases(settings, tenants, shard)
+    rate_share, owns_chat = worker_limits(shard)
+    engine = PollingEngine(
+        bot,
+        tenants,
+        concurrency=settings.POLL_CONCURRENCY,
+        session=session,
+        watermarks=WatermarkStore(settings.STATE_DB),
+        profiler=profiler,
+        outbox=OutboxStore(
+            settings.STATE_DB,
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+            window=settings.NOTIFY_WINDOW,
+        ),
+        history=HistoryStore(settings.STATE_DB),
+        leases=leases,
+        registry=registry,
+        rate_share=rate_share,
+        owns_chat=owns_chat,
+        settings=settings,
+    )
+    commands = None
+    if settings.BOT_COMMANDS and shard is None:
+        commands = create_commands(settings, tenants, engine)
+        commands.start()
+    try:
+        asyncio.run(engine.run())
+    except asyncio.CancelledError:
+        logger.info('Polling stopped by SIGTERM')
+    finally:
+        if commands is not None:
+            commands.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,91 @@
+"""Распределение студентов между узлами через аренду."""
+import logging
+import math
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+def preference(node_id, tenant_id):
+    """Насколько узлу хочется взять студента.
+    У разных узлов разный порядок предпочтений, поэтому они реже
+    пытаются забрать одних и тех же студентов.
+    """
+    return zlib.crc32(f'{node_id}:{tenant_id}'.encode())
+
+
+class LeaseManager:
+    """Держит аренду честной доли студентов для узла node_id.
+    heartbeat() продлевает аренду, добирает свободных студентов до
+    доли ceil(студенты / живые узлы) и отдаёт лишних, если узлов
+    стало больше. Если продлить аренду не удалось дольше ttl,
+    узел считает, что у него нет студентов: их уже могли забрать.
+    """
+
+    def __init__(self, backend, node_id, tenant_ids, ttl=30,
+                 clock=time.time):
+        """Аренда хранится в backend и живёт ttl секунд."""
+        self.backend = backend
+        self.node_id = node_id
+        self.tenant_ids = list(tenant_ids)
+        self.ttl = ttl
+        self.clock = clock
+        self.owned = set()
+        self.valid_until = 0
+
+    @property
+    def renew_interval(self):
+        """Как часто продлевать аренду."""
+        return self.ttl / 3
+
+    def owns(self, tenant_id):
+        """Узел сейчас отвечает за студента."""
+        return tenant_id in self.owned and self.clock() < self.valid_until
+
+    def heartbeat(self):
+        """Продлевает и перераспределяет аренду, возвращает студентов узла."""
+        started = self.clock()
+        nodes, owned = self.backend.heartbeat(self.node_id, self.ttl)
+        owned &= set(self.tenant_ids)
+        share = math.ceil(len(self.tenant_ids) / max(nodes, 1))
+        if len(owned) < share:
+            candidates = sorted(
+                (
+                    tenant_id for tenant_id in self.tenant_ids
+                    if tenant_id not in owned
+                ),
+                key=lambda tenant_id: preference(self.node_id, tenant_id),
+                reverse=True,
+            )
+            owned.update(self.backend.acquire(
+                self.node_id, candidates, self.ttl, share - len(owned)
+            ))
+        elif len(owned) > share:
+            extra = sorted(
+                owned,
+                key=lambda tenant_id: preference(self.node_id, tenant_id),
+            )[:len(owned) - share]
+            self.backend.release(self.node_id, extra)
+            owned.difference_update(extra)
+        if owned != self.owned:
+            logger.info(
+                f'Node {self.node_id} owns {len(owned)} tenants '
+                f'of {len(self.tenant_ids)}, {nodes} nodes alive'
+            )
+        self.owned = owned
+        self.valid_until = started + self.ttl
+        return owned
+
+    def set_tenants(self, tenant_ids):
+        """Меняет список студентов, аренду удалённых отдаёт сразу."""
+        self.tenant_ids = list(tenant_ids)
+        removed = self.owned - set(self.tenant_ids)
+        if removed:
+            self.backend.release(self.node_id, sorted(removed))
+            self.owned = self.owned - removed
+
+    def release(self):
+        """Отдаёт все аренды при остановке узла."""
+        self.backend.release(self.node_id)
+        self.owned = set()
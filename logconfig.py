@@ -0,0 +1,116 @@
+"""Неблокирующее логирование через очередь и фоновый поток."""
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s - %(name)s'
+
+tenant_id_var = contextvars.ContextVar('tenant_id', default='-')
+request_id_var = contextvars.ContextVar('request_id', default='-')
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет в запись id студента и запроса из контекста."""
+
+    def filter(self, record):
+        """Дополняет запись, никогда её не отбрасывает."""
+        record.tenant_id = tenant_id_var.get()
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает только долю sample_rate записей уровня INFO и ниже.
+    Предупреждения и ошибки пропускаются всегда.
+    """
+
+    def __init__(self, sample_rate=1.0, rand=random.random):
+        """Пропускает долю sample_rate записей уровня ниже WARNING."""
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rand = rand
+
+    def filter(self, record):
+        """Решает, попадёт ли запись в лог."""
+        if record.levelno > logging.INFO or self.sample_rate >= 1:
+            return True
+        return self.rand() < self.sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Компактная запись лога одной строкой JSON."""
+
+    def format(self, record):
+        """Сериализует запись."""
+        data = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'tenant': getattr(record, 'tenant_id', '-'),
+            'request': getattr(record, 'request_id', '-'),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class ContextQueueHandler(QueueHandler):
+    """Кладёт в очередь запись без форматирования.
+    Форматирование и запись в stdout выполняет фоновый поток,
+    здесь только подставляются аргументы сообщения и трейсбек.
+    При переполненной очереди запись отбрасывается и учитывается
+    в dropped: логирование не должно тормозить опрос.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record):
+        """Кладёт запись в очередь, не дожидаясь места в ней."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        """Готовит запись к передаче в другой поток."""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level=logging.INFO, json_format=False, sample_rate=1.0,
+                  stream=None, max_queue=100000):
+    """Направляет все логи через очередь в фоновый поток.
+    Возвращает запущенный QueueListener, его нужно остановить
+    при завершении, чтобы дописать очередь.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    )
+    log_queue = queue.Queue(max_queue)
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for old_handler in list(root.handlers):
+        root.removeHandler(old_handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
@@ -0,0 +1,164 @@
+"""Тексты уведомлений на разных языках."""
+import functools
+from string import Template
+
+from records import KNOWN_STATUSES
+
+DEFAULT_LOCALE = 'ru'
+
+CATALOGUE = {
+    'ru': {
+        'status': 'Изменился статус проверки работы "$name". $verdict',
+        'error': 'Ошибка в программе: $error',
+        'digest': 'Ошибки в программе за $minutes мин.:',
+        'digest_line': '$error (×$count): $message',
+        'homework': '"$name": $verdict',
+        'change': '$date "$name": $verdict',
+        'empty': 'Пока ничего не известно о ваших работах.',
+        'verdicts': {
+            'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
+            'reviewing': 'Работа взята на проверку ревьюером.',
+            'rejected': 'Работа проверена: у ревьюера есть замечания.',
+        },
+    },
+    'en': {
+        'status': 'The review status of "$name" has changed. $verdict',
+        'error': 'Program error: $error',
+        'digest': 'Program errors in the last $minutes min:',
+        'digest_line': '$error (×$count): $message',
+        'homework': '"$name": $verdict',
+        'change': '$date "$name": $verdict',
+        'empty': 'Nothing is known about your works yet.',
+        'verdicts': {
+            'approved': 'The work is reviewed: the reviewer liked it. Hooray!',
+            'reviewing': 'The work is being reviewed.',
+            'rejected': 'The work is reviewed: the reviewer left comments.',
+        },
+    },
+}
+
+
+def compile_template(text, fields):
+    """Компилирует шаблон и проверяет, что он использует только fields."""
+    template = Template(text)
+    try:
+        template.substitute({field: '' for field in fields})
+    except (KeyError, ValueError) as error:
+        raise ValueError(f'Invalid message template {text!r}: {error!r}')
+    return template
+
+
+class MessageCatalog:
+    """Шаблоны сообщений, скомпилированные один раз при создании.
+    Готовые тексты уведомлений кешируются по (язык, шаблон,
+    статус, название), поэтому повторная отрисовка ничего не стоит.
+    У студента может быть свой шаблон уведомления о статусе.
+    """
+
+    def __init__(self, catalogue=CATALOGUE, default_locale=DEFAULT_LOCALE,
+                 cache_size=4096):
+        """Отрендеренные сообщения кешируются, не больше cache_size."""
+        self.default_locale = default_locale
+        self.templates = {}
+        self.verdicts = {}
+        self.empty = {}
+        for locale, texts in catalogue.items():
+            missing = KNOWN_STATUSES - set(texts['verdicts'])
+            if missing:
+                raise ValueError(f'No verdicts for {missing} in {locale}')
+            self.verdicts[locale] = dict(texts['verdicts'])
+            self.templates[locale] = {
+                'status': compile_template(
+                    texts['status'], ('name', 'status', 'verdict')
+                ),
+                'error': compile_template(texts['error'], ('error',)),
+                'digest': compile_template(texts['digest'], ('minutes',)),
+                'digest_line': compile_template(
+                    texts['digest_line'], ('error', 'count', 'message')
+                ),
+                'homework': compile_template(
+                    texts['homework'], ('name', 'status', 'verdict')
+                ),
+                'change': compile_template(
+                    texts['change'], ('date', 'name', 'status', 'verdict')
+                ),
+            }
+            self.empty[locale] = texts['empty']
+        if default_locale not in self.templates:
+            raise ValueError(f'No messages for locale {default_locale}')
+        self.custom_templates = {}
+        self.render_status = functools.lru_cache(maxsize=cache_size)(
+            self.render_status
+        )
+
+    def locale(self, locale):
+        """Язык из каталога, по умолчанию — default_locale."""
+        return locale if locale in self.templates else self.default_locale
+
+    def custom_template(self, text):
+        """Скомпилированный шаблон студента, компилируется один раз."""
+        template = self.custom_templates.get(text)
+        if template is None:
+            template = compile_template(text, ('name', 'status', 'verdict'))
+            self.custom_templates[text] = template
+        return template
+
+    def render_status(self, locale, template, status, name):
+        """Текст уведомления о статусе, результат кешируется."""
+        locale = self.locale(locale)
+        compiled = (
+            self.custom_template(template) if template
+            else self.templates[locale]['status']
+        )
+        return compiled.substitute(
+            name=name, status=status, verdict=self.verdicts[locale][status]
+        )
+
+    def status_message(self, homework, locale=None, template=None):
+        """Уведомление об изменении статуса записи Homework."""
+        return self.render_status(
+            locale, template, homework.status, homework.name
+        )
+
+    def error_message(self, error, locale=None):
+        """Сообщение об ошибке в программе."""
+        return self.templates[self.locale(locale)]['error'].substitute(
+            error=str(error)
+        )
+
+    def error_digest(self, lines, window, locale=None):
+        """Сводка ошибок за окно window секунд.
+        lines - список (класс ошибки, число, последний текст).
+        """
+        templates = self.templates[self.locale(locale)]
+        header = templates['digest'].substitute(
+            minutes=max(1, round(window / 60))
+        )
+        return '\n'.join([header] + [
+            templates['digest_line'].substitute(
+                error=error, count=count, message=message
+            )
+            for error, count, message in lines
+        ])
+
+    def homework_list(self, homeworks, locale=None, kind='homework'):
+        """Ответ на команду: по строке на запись Homework.
+        kind='homework' — текущие статусы, kind='change' — история.
+        """
+        locale = self.locale(locale)
+        if not homeworks:
+            return self.empty[locale]
+        template = self.templates[locale][kind]
+        verdicts = self.verdicts[locale]
+        return '\n'.join(
+            template.substitute(
+                date=homework.date or '',
+                name=homework.name,
+                status=homework.status,
+                verdict=verdicts[homework.status],
+            )
+            for homework in homeworks
+        )
+
+
+DEFAULT_CATALOG = MessageCatalog()
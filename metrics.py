@@ -0,0 +1,270 @@
+"""Метрики бота в текстовом формате Prometheus."""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def format_labels(names, values, extra=()):
+    """Метки в виде {name="value",...}."""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in pairs
+    )
+    return '{' + body + '}'
+
+
+class Metric:
+    """Общая часть метрик: имя, описание и значения по меткам."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Значения хранятся по кортежам меток labelnames."""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def labels(self, *values):
+        """Дочерняя метрика с заданными значениями меток."""
+        return LabeledMetric(self, tuple(str(value) for value in values))
+
+    def render(self):
+        """Строки метрики в формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self.lock:
+            items = sorted(self.values.items())
+        for labelvalues, value in items:
+            lines.extend(self.render_value(labelvalues, value))
+        return lines
+
+    def render_value(self, labelvalues, value):
+        """Строки одного набора меток."""
+        labels = format_labels(self.labelnames, labelvalues)
+        return [f'{self.name}{labels} {value}']
+
+
+class LabeledMetric:
+    """Метрика с зафиксированными значениями меток."""
+
+    __slots__ = ('metric', 'labelvalues')
+
+    def __init__(self, metric, labelvalues):
+        """Значения меток labelvalues идут в порядке labelnames."""
+        self.metric = metric
+        self.labelvalues = labelvalues
+
+    def __getattr__(self, name):
+        """Проксирует inc/set/observe/time к родительской метрике."""
+        method = getattr(self.metric, name)
+
+        def bound(*args, **kwargs):
+            return method(*args, labelvalues=self.labelvalues, **kwargs)
+
+        return bound
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, labelvalues=()):
+        """Увеличивает счётчик."""
+        with self.lock:
+            self.values[labelvalues] = (
+                self.values.get(labelvalues, 0) + amount
+            )
+
+
+class Gauge(Metric):
+    """Текущее значение, например глубина очереди."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        """Значения по меткам labelnames."""
+        super().__init__(name, documentation, labelnames)
+        self.functions = {}
+
+    def set(self, value, labelvalues=()):
+        """Устанавливает значение."""
+        with self.lock:
+            self.values[labelvalues] = value
+
+    def set_function(self, function, labelvalues=()):
+        """Значение будет вычисляться function() при каждом чтении."""
+        with self.lock:
+            self.functions[labelvalues] = function
+
+    def render(self):
+        """Перед выводом вызывает функции значений."""
+        with self.lock:
+            functions = list(self.functions.items())
+        for labelvalues, function in functions:
+            try:
+                self.set(function(), labelvalues=labelvalues)
+            except Exception:
+                logger.exception(f'Failed to collect {self.name}')
+        return super().render()
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=LATENCY_BUCKETS):
+        """Наблюдения раскладываются по границам buckets."""
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labelvalues=()):
+        """Учитывает одно значение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total = self.values.get(
+                labelvalues, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts = list(counts)
+            counts[index] += 1
+            self.values[labelvalues] = (counts, total + value)
+
+    @contextmanager
+    def time(self, labelvalues=()):
+        """Замеряет время выполнения блока with."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, labelvalues)
+
+    def render_value(self, labelvalues, value):
+        """Накопительные корзины, сумма и число наблюдений."""
+        counts, total = value
+        lines = []
+        cumulative = 0
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, counts):
+            cumulative += count
+            labels = format_labels(
+                self.labelnames, labelvalues, [('le', bound)]
+            )
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = format_labels(self.labelnames, labelvalues)
+        lines.append(f'{self.name}_sum{labels} {total}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Набор метрик, которые отдаются одним ответом."""
+
+    def __init__(self):
+        """Пустой реестр метрик."""
+        self.metrics = []
+
+    def register(self, metric):
+        """Добавляет метрику и возвращает её."""
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+API_LATENCY = REGISTRY.register(Histogram(
+    'homework_bot_api_request_seconds', 'Время запроса к API Практикума.'
+))
+API_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    'homework_bot_api_response_bytes', 'Размер ответа API Практикума.',
+    buckets=SIZE_BUCKETS,
+))
+CHECK_RESPONSE_TIME = REGISTRY.register(Histogram(
+    'homework_bot_check_response_seconds', 'Время check_response.'
+))
+PARSE_STATUS_TIME = REGISTRY.register(Histogram(
+    'homework_bot_parse_status_seconds', 'Время parse_status.'
+))
+TELEGRAM_LATENCY = REGISTRY.register(Histogram(
+    'homework_bot_telegram_send_seconds', 'Время отправки в Telegram.'
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'homework_bot_outbound_queue_depth', 'Сообщений в очереди на отправку.'
+))
+LOOP_LAG = REGISTRY.register(Histogram(
+    'homework_bot_loop_lag_seconds',
+    'Опоздание такта планировщика относительно расписания.',
+))
+HEDGED_REQUESTS = REGISTRY.register(Gauge(
+    'homework_bot_hedged_requests', 'Счётчики дублирующих запросов.',
+    labelnames=('kind',),
+))
+ERRORS = REGISTRY.register(Counter(
+    'homework_bot_errors_total', 'Ошибки по классам исключений.',
+    labelnames=('exception',),
+))
+
+
+def count_error(error):
+    """Учитывает исключение в счётчике ошибок."""
+    ERRORS.labels(type(error).__name__).inc()
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Запускает HTTP-сервер метрик в фоновом потоке.
+    http.server импортируется здесь, а не при загрузке модуля:
+    пока метрики не включены, он не нужен.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Отдаёт метрики по GET /metrics."""
+
+        def log_message(self, format, *args):
+            """Запросы метрик не пишутся в лог бота."""
+
+        def do_GET(self):
+            """Ответ с текущими значениями метрик."""
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f'Metrics are served on http://{host}:{port}/metrics')
+    return server
@@ -0,0 +1,121 @@
+"""Профилирование цикла опроса по запросу, без перезапуска бота."""
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+CPROFILE = 'cprofile'
+SAMPLING = 'sampling'
+
+
+class StackSampler:
+    """Периодически снимает стеки всех потоков.
+    Результат — свёрнутые стеки (folded) для построения flamegraph.
+    В отличие от cProfile видит и пул потоков с запросами к API.
+    """
+
+    def __init__(self, interval=0.005):
+        """Стек снимается раз в interval секунд."""
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def enable(self):
+        """Запускает поток, снимающий стеки."""
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def disable(self):
+        """Останавливает снятие стеков."""
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        """Снимает стеки до остановки."""
+        own = threading.get_ident()
+        names = {}
+        while not self.stopped.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f'{code.co_name} '
+                        f'({os.path.basename(code.co_filename)}'
+                        f':{code.co_firstlineno})'
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump_stats(self, path):
+        """Пишет свёрнутые стеки в файл."""
+        with open(path, 'w', encoding='utf-8') as folded:
+            for stack, count in self.stacks.most_common():
+                folded.write(f'{stack} {count}\n')
+
+
+class LoopProfiler:
+    """Профилирует заданное число итераций цикла опроса.
+    Профилирование включается вызовом request(), например из
+    обработчика сигнала, и само выключается через iterations
+    итераций. Результат сохраняется в directory.
+    """
+
+    def __init__(self, directory='profiles', iterations=60, mode=CPROFILE):
+        """Профили вида mode пишутся в directory.
+        По сигналу профилируются iterations итераций.
+        """
+        if mode not in (CPROFILE, SAMPLING):
+            raise ValueError(f'Unknown profiling mode: {mode}')
+        self.directory = directory
+        self.iterations = iterations
+        self.mode = mode
+        self.requested = 0
+        self.remaining = 0
+        self.profiler = None
+
+    def request(self, iterations=None):
+        """Просит профилировать ближайшие итерации."""
+        self.requested = iterations or self.iterations
+
+    def tick(self):
+        """Вызывается в начале каждой итерации цикла."""
+        if self.profiler is not None:
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.finish()
+        elif self.requested:
+            self.remaining, self.requested = self.requested, 0
+            self.profiler = (
+                cProfile.Profile() if self.mode == CPROFILE
+                else StackSampler()
+            )
+            logger.info(f'Profiling {self.remaining} iterations')
+            self.profiler.enable()
+
+    def finish(self):
+        """Выключает профилировщик и сохраняет результат."""
+        profiler, self.profiler = self.profiler, None
+        profiler.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        extension = 'pstats' if self.mode == CPROFILE else 'folded'
+        path = os.path.join(
+            self.directory,
+            f'{self.mode}-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}'
+            f'.{extension}',
+        )
+        profiler.dump_stats(path)
+        logger.info(f'Profile is saved to {path}')
+        return path
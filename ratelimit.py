@@ -0,0 +1,49 @@
+"""Ограничение частоты операций."""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'clock')
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Пополняется на rate токенов в секунду до capacity."""
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def refill(self):
+        """Начисляет токены за прошедшее время."""
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """Пытается взять токены.
+        Возвращает 0, если токены взяты, иначе сколько секунд
+        нужно подождать до их появления.
+        """
+        self.refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0
+        return (tokens - self.tokens) / self.rate
+
+    def is_full(self):
+        """Корзина полна: ей давно не пользовались."""
+        self.refill()
+        return self.tokens >= self.capacity
+
+
+async def wait_for_token(bucket):
+    """Ждёт, пока в корзине появится токен, и забирает его."""
+    delay = bucket.acquire()
+    while delay:
+        await asyncio.sleep(delay)
+        delay = bucket.acquire()
@@ -0,0 +1,54 @@
+"""Компактное представление домашней работы."""
+from exceptions import ExceptionResponseError, ExceptionStatusUnknown
+
+KNOWN_STATUSES = frozenset(('approved', 'reviewing', 'rejected'))
+
+
+class Homework:
+    """Домашка с единственными нужными боту полями.
+    Проверяется один раз при создании из ответа API, дальше
+    код работает с уже проверенной записью.
+    """
+
+    __slots__ = ('id', 'name', 'status', 'date')
+
+    def __init__(self, id, name, status, date=None):
+        """Поля уже проверены, из ответа API запись создаёт from_dict."""
+        self.id = id
+        self.name = name
+        self.status = status
+        self.date = date
+
+    def __repr__(self):
+        """Запись в отладочном виде."""
+        return (
+            f'Homework(id={self.id!r}, name={self.name!r}, '
+            f'status={self.status!r}, date={self.date!r})'
+        )
+
+    def __eq__(self, other):
+        """Записи равны, если равны все поля."""
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return (
+            (self.id, self.name, self.status, self.date)
+            == (other.id, other.name, other.status, other.date)
+        )
+
+    @property
+    def key(self):
+        """Ключ домашки: id, а если его нет — название."""
+        return self.name if self.id is None else self.id
+
+    @classmethod
+    def from_dict(cls, data):
+        """Проверяет домашку из ответа API и создаёт запись."""
+        if not isinstance(data, dict):
+            raise ExceptionResponseError('Домашка не является словарем!')
+        status = data.get('status')
+        if status not in KNOWN_STATUSES:
+            raise ExceptionStatusUnknown('Status hw unknown!')
+        name = data.get('homework_name')
+        if name is None:
+            raise ExceptionStatusUnknown('Homework unknown!')
+        return cls(data.get('id'), name, status, data.get('date_updated'))
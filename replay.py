@@ -0,0 +1,299 @@
+"""Запись ответов API и их воспроизведение без сети.
+Запись включается в боте переменной RECORD_FILE. Воспроизведение:
+
+    python replay.py recording.jsonl.gz --speed 10
+
+С --speed 0 записи прогоняются без пауз, как нагрузочный тест.
+
+Каждый записанный опрос проходит check_response, разбор статусов и
+отправку уведомлений, как в боте. Уведомления печатаются в stdout
+вместо Telegram. Ответы отдаются с записанной задержкой, опросы идут
+с записанными интервалами, ускоренными в speed раз.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+from logconfig import tenant_id_var
+
+FLUSH_EVERY = 100
+
+logger = logging.getLogger(__name__)
+
+
+class Recorder:
+    """Пишет запросы к API в сжатый файл JSON Lines.
+    На запрос приходится одна строка: время запроса, студент,
+    from_date, код и тело ответа или класс исключения, время ответа.
+    Токены не записываются. Файл дописывается, поэтому несколько
+    запусков подряд складываются в одну запись.
+    """
+
+    def __init__(self, path, clock=time.time):
+        """Запись дописывается в gzip-файл path."""
+        self.file = gzip.open(path, 'at', encoding='utf-8')
+        self.lock = threading.Lock()
+        self.clock = clock
+        self.written = 0
+
+    def write(self, record):
+        """Дописывает запись, буфер сбрасывается раз в FLUSH_EVERY записей."""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            self.file.write(line + '\n')
+            self.written += 1
+            if self.written % FLUSH_EVERY == 0:
+                self.file.flush()
+
+    def close(self):
+        """Дописывает буфер и закрывает файл."""
+        with self.lock:
+            self.file.close()
+
+
+class RecordingSession:
+    """Сессия requests, которая записывает каждый запрос в recorder.
+    Тело ответа читается целиком, даже при потоковом разборе.
+    """
+
+    def __init__(self, session, recorder):
+        """Запросы идут через session и пишутся в recorder."""
+        self.session = session
+        self.recorder = recorder
+
+    def get(self, url, params=None, **kwargs):
+        """Выполняет запрос и записывает его вместе с ответом."""
+        record = {
+            't': round(self.recorder.clock(), 3),
+            'tenant': tenant_id_var.get(),
+            'from_date': (params or {}).get('from_date'),
+        }
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, params=params, **kwargs)
+            record['status'] = response.status_code
+            record['body'] = response.content.decode('utf-8', 'replace')
+            return response
+        except requests.exceptions.RequestException as error:
+            record['error'] = type(error).__name__
+            record['body'] = str(error)
+            raise
+        finally:
+            record['elapsed'] = round(time.monotonic() - started, 3)
+            self.recorder.write(record)
+
+    def close(self):
+        """Закрывает сессию и файл записи."""
+        if self.session is not requests:
+            self.session.close()
+        self.recorder.close()
+
+
+def read_lines(path):
+    """Строки записи.
+    Файл, оборванный падением или остановкой бота, читается до
+    последней сброшенной на диск полной строки.
+    """
+    lines = []
+    with gzip.open(path, 'rt', encoding='utf-8') as recording:
+        try:
+            for line in recording:
+                lines.append(line)
+        except EOFError:
+            if lines and not lines[-1].endswith('\n'):
+                lines.pop()
+            logger.warning(
+                f'Recording {path} is cut off, read {len(lines)} lines'
+            )
+    return lines
+
+
+def load_recordings(paths):
+    """Записи из файлов по времени, t — смещение от первой записи."""
+    records = []
+    for path in paths:
+        records.extend(
+            json.loads(line) for line in read_lines(path) if line.strip()
+        )
+    records.sort(key=lambda record: record['t'])
+    if records:
+        started = records[0]['t']
+        for record in records:
+            record['t'] -= started
+    return records
+
+
+class ReplayResponse:
+    """Ответ API, восстановленный из записи."""
+
+    def __init__(self, status_code, content):
+        """Ответ с кодом status_code и телом content."""
+        self.status_code = status_code
+        self.content = content
+
+    def json(self):
+        """Тело ответа как JSON."""
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        """Тело ответа кусками, как при потоковом чтении."""
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        """Закрывать нечего."""
+
+
+class ReplaySession:
+    """Отдаёт записанные ответы вместо запросов к API.
+    Перед опросом студента его запись кладётся в pending, ответ
+    задерживается на записанное время, делённое на speed.
+    """
+
+    def __init__(self, speed=1.0):
+        """Паузы между ответами сжимаются в speed раз."""
+        self.speed = speed
+        self.pending = {}
+
+    def get(self, url, params=None, **kwargs):
+        """Записанный ответ для текущего студента."""
+        record = self.pending.pop(tenant_id_var.get())
+        if self.speed:
+            time.sleep(record.get('elapsed', 0) / self.speed)
+        if 'error' in record:
+            error_class = getattr(
+                requests.exceptions, record['error'],
+                requests.exceptions.RequestException,
+            )
+            raise error_class(record['body'])
+        return ReplayResponse(record['status'], record['body'].encode('utf-8'))
+
+    def close(self):
+        """Закрывать нечего."""
+
+
+class ReplayBot:
+    """Бот, который печатает уведомления вместо отправки."""
+
+    def __init__(self, stream=None):
+        """Сообщения печатаются в stream."""
+        self.stream = stream
+        self.sent = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        """Печатает уведомление."""
+        self.sent += 1
+        if self.stream is not None:
+            self.stream.write(
+                f'{chat_id}\t{json.dumps(text, ensure_ascii=False)}\n'
+            )
+
+
+async def replay(engine, session, records, speed=1.0):
+    """Прогоняет записи через движок с записанными интервалами."""
+    loop = asyncio.get_running_loop()
+    engine.start()
+    started = loop.time()
+    results = Counter()
+    running = {}
+
+    async def poll(state):
+        await engine.poll_tenant(state)
+        results['polls'] += 1
+
+    try:
+        for record in records:
+            state = engine.by_tenant.get(record['tenant'])
+            if state is None:
+                results['skipped'] += 1
+                continue
+            if speed:
+                await asyncio.sleep(
+                    max(0, started + record['t'] / speed - loop.time())
+                )
+            previous = running.get(record['tenant'])
+            if previous is not None:
+                await previous
+            session.pending[record['tenant']] = record
+            running[record['tenant']] = asyncio.ensure_future(poll(state))
+        await asyncio.gather(*running.values())
+        engine.release(force=True)
+        await engine.dispatcher.join()
+    finally:
+        await engine.stop()
+    results['seconds'] = round(loop.time() - started, 3)
+    results['errors'] = sum(
+        count
+        for bucket in engine.errors.buckets.values()
+        for count, _ in bucket.values()
+    )
+    return results
+
+
+def parse_args(argv=None):
+    """Параметры воспроизведения."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recordings', nargs='+',
+                        help='файлы записи, например от нескольких воркеров')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='ускорение, 0 — без пауз')
+    parser.add_argument('--tenants',
+                        help='TENANTS_FILE с чатами и языками студентов')
+    parser.add_argument('--quiet', action='store_true',
+                        help='не печатать уведомления')
+    parser.add_argument('--verbose', action='store_true',
+                        help='не отключать логи бота')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Воспроизводит запись и печатает итоги."""
+    from dispatcher import OutboundDispatcher
+    from engine import PollingEngine
+    from ratelimit import TokenBucket
+    from tenants import Tenant, load_tenants, valid_tenants
+
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+    records = load_recordings(args.recordings)
+    if args.tenants:
+        tenants = valid_tenants(load_tenants(args.tenants))
+    else:
+        tenants = [
+            Tenant(tenant_id, 'replay', tenant_id)
+            for tenant_id in sorted({
+                record['tenant'] for record in records
+                if record['tenant'] is not None
+            })
+        ]
+    session = ReplaySession(args.speed)
+    bot = ReplayBot(None if args.quiet else sys.stdout)
+    engine = PollingEngine(
+        bot,
+        tenants,
+        concurrency=min(len(tenants), 64) or 1,
+        session=session,
+        api_budget=TokenBucket(float('inf')),
+    )
+    engine.dispatcher = OutboundDispatcher(
+        engine.deliver, global_rate=float('inf'), chat_rate=float('inf'),
+        chat_burst=float('inf'),
+    )
+    results = asyncio.run(replay(engine, session, records, args.speed))
+    results['notifications'] = bot.sent
+    for key, value in sorted(results.items()):
+        print(f'{key:>14}: {value}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
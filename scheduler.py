@@ -0,0 +1,89 @@
+"""Расписание опросов API для каждого студента."""
+import math
+import random
+import zlib
+
+
+class AdaptivePolicy:
+    """Выбирает паузу до следующего опроса студента.
+    Пока работа на проверке, API опрашивается чаще. Без изменений
+    пауза растёт до idle_max. После ошибок API пауза растёт
+    экспоненциально до error_max и размывается случайной добавкой.
+    """
+
+    def __init__(self, base, reviewing, idle_max, error_base, error_max,
+                 idle_growth=2, rand=random.random):
+        """Паузы в секундах для опроса, проверки, простоя и ошибок.
+        К паузам rand добавляет случайный разброс.
+        """
+        self.base = base
+        self.reviewing = reviewing
+        self.idle_max = idle_max
+        self.error_base = error_base
+        self.error_max = error_max
+        self.idle_growth = idle_growth
+        self.rand = rand
+
+    def next_interval(self, state):
+        """Пауза в секундах для состояния студента."""
+        if state.failures:
+            delay = min(
+                self.error_max, self.error_base * 2 ** (state.failures - 1)
+            )
+            return delay / 2 + self.rand() * delay / 2
+        if state.reviewing:
+            return self.reviewing
+        return min(
+            self.idle_max, self.base * self.idle_growth ** state.idle_polls
+        )
+
+
+def phase_offset(key, interval):
+    """Постоянный для ключа сдвиг первого опроса внутри интервала.
+    Студенты равномерно распределяются по интервалу и не будят
+    API одновременно, в том числе после перезапуска.
+    """
+    return zlib.crc32(str(key).encode('utf-8')) % max(int(interval), 1)
+
+
+class TimingWheel:
+    """Хешированное колесо таймеров.
+    Постановка в расписание и выборка на каждом такте — O(1)
+    в среднем на запись. Задержки длиннее оборота колеса хранятся
+    в том же слоте и отсеиваются по номеру такта.
+    """
+
+    def __init__(self, tick=1.0, slots=4096):
+        """Колесо из slots слотов по tick секунд."""
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current = 0
+        self.size = 0
+
+    def __len__(self):
+        """Число записей в колесе."""
+        return self.size
+
+    def schedule(self, item, delay):
+        """Ставит item на срабатывание через delay секунд."""
+        ticks = max(1, math.ceil(delay / self.tick))
+        due = self.current + ticks
+        self.slots[due % len(self.slots)].append((due, item))
+        self.size += 1
+
+    def advance(self):
+        """Сдвигает колесо на один такт и возвращает сработавшие записи."""
+        self.current += 1
+        index = self.current % len(self.slots)
+        slot = self.slots[index]
+        if not slot:
+            return []
+        fired = [item for due, item in slot if due <= self.current]
+        if len(fired) < len(slot):
+            self.slots[index] = [
+                (due, item) for due, item in slot if due > self.current
+            ]
+        else:
+            self.slots[index] = []
+        self.size -= len(fired)
+        return fired
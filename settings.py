@@ -0,0 +1,99 @@
+"""Настройки бота из переменных окружения."""
+import os
+
+_current = None
+
+
+def flag(value):
+    """Переменная-флаг включена значением '1'."""
+    return value == '1'
+
+
+class Settings:
+    """Настройки, прочитанные из окружения один раз.
+    Имена атрибутов совпадают с именами переменных окружения.
+    """
+
+    def __init__(self, environ=None):
+        """Значения читаются из environ, по умолчанию из os.environ."""
+        env = os.environ if environ is None else environ
+        self.PRACTICUM_TOKEN = env.get('PRACTICUM_TOKEN')
+        self.TELEGRAM_TOKEN = env.get('TELEGRAM_TOKEN')
+        self.TELEGRAM_CHAT_ID = env.get('TELEGRAM_CHAT_ID')
+        self.TENANTS_FILE = env.get('TENANTS_FILE')
+        self.TENANTS_DB = env.get('TENANTS_DB')
+        self.TENANTS_RELOAD_INTERVAL = float(
+            env.get('TENANTS_RELOAD_INTERVAL', 5)
+        )
+        self.POLL_CONCURRENCY = int(env.get('POLL_CONCURRENCY', 64))
+        self.API_CONNECT_TIMEOUT = float(env.get('API_CONNECT_TIMEOUT', 5))
+        self.API_READ_TIMEOUT = float(env.get('API_READ_TIMEOUT', 30))
+        self.POOL_CONNECTIONS = int(env.get('POOL_CONNECTIONS', 1))
+        self.HEDGE_REQUESTS = flag(env.get('HEDGE_REQUESTS'))
+        self.POOL_MAXSIZE = int(env.get(
+            'POOL_MAXSIZE',
+            self.POLL_CONCURRENCY * (2 if self.HEDGE_REQUESTS else 1),
+        ))
+        self.SEND_WORKERS = int(env.get('SEND_WORKERS', 8))
+        self.SEND_QUEUE_SIZE = int(env.get('SEND_QUEUE_SIZE', 10000))
+        self.TELEGRAM_GLOBAL_RATE = float(env.get('TELEGRAM_GLOBAL_RATE', 30))
+        self.TELEGRAM_CHAT_RATE = float(env.get('TELEGRAM_CHAT_RATE', 1))
+        self.PROFILE_DIR = env.get('PROFILE_DIR', 'profiles')
+        self.PROFILE_MODE = env.get('PROFILE_MODE', 'cprofile')
+        self.PROFILE_ITERATIONS = int(env.get('PROFILE_ITERATIONS', 0))
+        self.LOG_JSON = flag(env.get('LOG_JSON'))
+        self.LOG_SAMPLE_RATE = float(env.get('LOG_SAMPLE_RATE', 1))
+        self.METRICS_PORT = int(env.get('METRICS_PORT', 0))
+        self.STREAM_RESPONSES = flag(env.get('STREAM_RESPONSES'))
+        self.STREAM_CHUNK_SIZE = int(env.get('STREAM_CHUNK_SIZE', 65536))
+        self.STREAM_MAX_HOMEWORKS = int(env.get('STREAM_MAX_HOMEWORKS', 0))
+        self.STATE_DB = env.get('STATE_DB', 'homework_bot.sqlite3')
+        self.OUTBOX_MAX_ATTEMPTS = int(env.get('OUTBOX_MAX_ATTEMPTS', 10))
+        self.OUTBOX_RETENTION = int(
+            env.get('OUTBOX_RETENTION', 7 * 24 * 60 * 60)
+        )
+        self.OUTBOX_BATCH = int(env.get('OUTBOX_BATCH', 100))
+        self.BOT_COMMANDS = flag(env.get('BOT_COMMANDS'))
+        self.WORKERS = int(env.get('WORKERS', 1))
+        self.LEASES = flag(env.get('LEASES'))
+        self.LEASE_DB = env.get('LEASE_DB', self.STATE_DB)
+        self.LEASE_TTL = float(env.get('LEASE_TTL', 30))
+        self.NODE_ID = env.get('NODE_ID')
+        self.ERROR_WINDOW = int(env.get('ERROR_WINDOW', 300))
+        self.ERROR_REPEAT_AFTER = int(env.get('ERROR_REPEAT_AFTER', 3600))
+        self.RECORD_FILE = env.get('RECORD_FILE')
+        self.NOTIFY_WINDOW = float(env.get('NOTIFY_WINDOW', 0))
+        self.NOTIFY_MAX_LENGTH = int(env.get('NOTIFY_MAX_LENGTH', 4096))
+        self.RETRY_TIME = int(env.get('RETRY_TIME', 600))
+        self.REVIEWING_RETRY_TIME = int(env.get('REVIEWING_RETRY_TIME', 120))
+        self.IDLE_MAX_RETRY_TIME = int(env.get('IDLE_MAX_RETRY_TIME', 3600))
+        self.ERROR_RETRY_TIME = int(env.get('ERROR_RETRY_TIME', 30))
+        self.ERROR_MAX_RETRY_TIME = int(env.get('ERROR_MAX_RETRY_TIME', 3600))
+        self.API_REQUESTS_PER_SECOND = float(
+            env.get('API_REQUESTS_PER_SECOND', 10)
+        )
+        self.BREAKER_FAILURES = int(env.get('BREAKER_FAILURES', 5))
+        self.BREAKER_RESET_TIME = int(env.get('BREAKER_RESET_TIME', 60))
+        self.BREAKER_PROBES = int(env.get('BREAKER_PROBES', 1))
+        self.HEDGE_PERCENTILE = float(env.get('HEDGE_PERCENTILE', 95))
+        self.HEDGE_MIN_DELAY = float(env.get('HEDGE_MIN_DELAY', 0.5))
+
+
+def get_settings():
+    """Текущие настройки, при первом обращении читаются из окружения."""
+    global _current
+    if _current is None:
+        _current = Settings()
+    return _current
+
+
+def load_settings():
+    """Подгружает .env и читает настройки заново.
+    Вызывается один раз при запуске, до создания движка опроса.
+    """
+    from dotenv import load_dotenv
+
+    global _current
+    load_dotenv()
+    _current = Settings()
+    return _current
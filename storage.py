@@ -0,0 +1,471 @@
+"""Локальное хранилище состояния бота в SQLite."""
+import itertools
+import sqlite3
+import threading
+import time
+import uuid
+
+from records import Homework
+
+
+def connect(path):
+    """Открывает базу SQLite в режиме WAL.
+    Соединение общее для потоков, доступ к нему защищается
+    блокировкой на стороне хранилища.
+    """
+    connection = sqlite3.connect(
+        path, check_same_thread=False, isolation_level=None
+    )
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    return connection
+
+
+class WatermarkStore:
+    """Последний подтверждённый сервером current_date для каждого студента.
+    Значение только растёт: запись более старой отметки игнорируется.
+    """
+
+    def __init__(self, path):
+        """Открывает или создаёт базу path."""
+        self.lock = threading.Lock()
+        self.connection = connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS watermarks ('
+            'tenant_id TEXT PRIMARY KEY, '
+            'from_date INTEGER NOT NULL)'
+        )
+
+    def get(self, tenant_id, default=None):
+        """Возвращает отметку студента или default."""
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT from_date FROM watermarks WHERE tenant_id = ?',
+                (tenant_id,),
+            ).fetchone()
+        return default if row is None else row[0]
+
+    def load_all(self):
+        """Все отметки в виде словаря tenant_id -> from_date."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT tenant_id, from_date FROM watermarks'
+            ).fetchall()
+        return dict(rows)
+
+    def advance(self, tenant_id, from_date):
+        """Сдвигает отметку студента вперёд."""
+        with self.lock:
+            self.connection.execute(
+                'INSERT INTO watermarks (tenant_id, from_date) '
+                'VALUES (?, ?) '
+                'ON CONFLICT (tenant_id) DO UPDATE SET '
+                'from_date = MAX(from_date, excluded.from_date)',
+                (tenant_id, from_date),
+            )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self.lock:
+            self.connection.close()
+
+
+PENDING = 'pending'
+DELIVERED = 'delivered'
+FAILED = 'failed'
+
+
+class OutboxStore:
+    """Журнал исходящих сообщений, переживающий падение бота.
+    Сообщение записывается до отправки и помечается доставленным
+    после неё. Ключ идемпотентности не даёт поставить одно и то же
+    уведомление дважды, например после повторного опроса. Новые
+    записи копятся в памяти и сохраняются одной транзакцией в flush().
+    Новое сообщение ждёт отправки window секунд: за это время к нему
+    могут добавиться другие сообщения того же чата.
+    """
+
+    def __init__(self, path, max_attempts=10, retry_base=5, retry_max=3600,
+                 lease=120, window=0, clock=time.time):
+        """Открывает или создаёт базу path.
+        Пауза между повторами растёт от retry_base до retry_max
+        секунд, после max_attempts попыток запись считается неотправленной.
+        """
+        self.lock = threading.Lock()
+        self.buffer_lock = threading.Lock()
+        self.window = window
+        self.connection = connect(path)
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self.clock = clock
+        self.buffer = []
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS outbox ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'key TEXT NOT NULL UNIQUE, '
+            'chat_id TEXT NOT NULL, '
+            'text TEXT NOT NULL, '
+            'state TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'next_attempt REAL NOT NULL, '
+            'updated REAL NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS outbox_due '
+            'ON outbox (state, next_attempt)'
+        )
+
+    def add(self, chat_id, text, key=None):
+        """Добавляет сообщение в буфер записи."""
+        with self.buffer_lock:
+            self.buffer.append((key or uuid.uuid4().hex, str(chat_id), text))
+
+    def flush(self):
+        """Сохраняет буфер одной транзакцией.
+        Если запись не удалась, например база занята другим процессом,
+        сообщения остаются в буфере до следующего flush(). Буфер
+        забирается под блокировкой базы, поэтому flush() возвращается
+        только после записи всего, что было добавлено до него, даже
+        если это забрал flush() из другого потока.
+        """
+        now = self.clock()
+        with self.lock:
+            with self.buffer_lock:
+                buffer, self.buffer = self.buffer, []
+            if not buffer:
+                return
+            try:
+                self.connection.execute('BEGIN')
+                self.connection.executemany(
+                    'INSERT OR IGNORE INTO outbox '
+                    '(key, chat_id, text, state, next_attempt, updated) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(key, chat_id, text, PENDING, now + self.window, now)
+                     for key, chat_id, text in buffer],
+                )
+                self.connection.execute('COMMIT')
+            except sqlite3.Error:
+                if self.connection.in_transaction:
+                    self.connection.execute('ROLLBACK')
+                with self.buffer_lock:
+                    self.buffer = buffer + self.buffer
+                raise
+
+    def claim(self, limit=100, exclude=(), owns_chat=None):
+        """Забирает сообщения, которые пора отправить: (id, chat_id, text).
+        Забранные сообщения на lease секунд откладываются, поэтому
+        несколько процессов с общей базой не отправят их дважды.
+        Если процесс упал, не отметив доставку, сообщение снова
+        станет доступным по истечении lease. Вместе с созревшими
+        забираются ещё ждущие окна сообщения тех же чатов. С owns_chat
+        забираются только сообщения чатов, для которых он вернёт True.
+        """
+        if limit <= 0:
+            return []
+        now = self.clock()
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                rows = []
+                for row in self.connection.execute(
+                    'SELECT id, chat_id, text FROM outbox '
+                    'WHERE state = ? AND next_attempt <= ? ORDER BY id',
+                    (PENDING, now),
+                ):
+                    if row[0] in exclude:
+                        continue
+                    if owns_chat is not None and not owns_chat(row[1]):
+                        continue
+                    rows.append(row)
+                    if len(rows) >= limit:
+                        break
+                if rows and self.window:
+                    rows = self.with_waiting(rows, now, exclude, limit)
+                self.connection.executemany(
+                    'UPDATE outbox SET next_attempt = ? WHERE id = ?',
+                    [(now + self.lease, row[0]) for row in rows],
+                )
+            finally:
+                self.connection.execute('COMMIT')
+        return rows
+
+    def with_waiting(self, rows, now, exclude, limit):
+        """Добавляет к rows ждущие окна сообщения тех же чатов.
+        Всего сообщений остаётся не больше limit.
+        """
+        chats = sorted({row[1] for row in rows})
+        claimed = {row[0] for row in rows}
+        waiting = self.connection.execute(
+            'SELECT id, chat_id, text FROM outbox '
+            'WHERE state = ? AND next_attempt <= ? '
+            f'AND chat_id IN ({", ".join("?" * len(chats))})',
+            (PENDING, now + self.window, *chats),
+        ).fetchall()
+        rows.extend(itertools.islice((
+            row for row in waiting
+            if row[0] not in claimed and row[0] not in exclude
+        ), max(limit - len(rows), 0)))
+        return sorted(rows)
+
+    def renew(self, message_ids):
+        """Продлевает аренду забранных, но ещё не отправленных сообщений."""
+        until = self.clock() + self.lease
+        with self.lock:
+            self.connection.executemany(
+                'UPDATE outbox SET next_attempt = ? '
+                'WHERE id = ? AND state = ?',
+                [(until, message_id, PENDING) for message_id in message_ids],
+            )
+
+    def release(self, message_ids):
+        """Возвращает забранные, но не отправленные сообщения в очередь."""
+        now = self.clock()
+        with self.lock:
+            self.connection.executemany(
+                'UPDATE outbox SET next_attempt = ? '
+                'WHERE id = ? AND state = ?',
+                [(now, message_id, PENDING) for message_id in message_ids],
+            )
+
+    def delivered(self, message_id):
+        """Помечает сообщение доставленным."""
+        with self.lock:
+            self.connection.execute(
+                'UPDATE outbox SET state = ?, updated = ? WHERE id = ?',
+                (DELIVERED, self.clock(), message_id),
+            )
+
+    def failed(self, message_id):
+        """Откладывает повтор отправки, после max_attempts сдаётся."""
+        now = self.clock()
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT attempts FROM outbox WHERE id = ?', (message_id,)
+            ).fetchone()
+            if row is None:
+                return
+            attempts = row[0] + 1
+            state = FAILED if attempts >= self.max_attempts else PENDING
+            delay = min(self.retry_max, self.retry_base * 2 ** attempts)
+            self.connection.execute(
+                'UPDATE outbox SET state = ?, attempts = ?, '
+                'next_attempt = ?, updated = ? WHERE id = ?',
+                (state, attempts, now + delay, now, message_id),
+            )
+
+    def purge(self, older_than):
+        """Удаляет доставленные и брошенные сообщения старше older_than."""
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM outbox WHERE state != ? AND updated < ?',
+                (PENDING, self.clock() - older_than),
+            )
+
+    def close(self):
+        """Сохраняет буфер и закрывает соединение."""
+        self.flush()
+        with self.lock:
+            self.connection.close()
+
+
+class HistoryStore:
+    """Изменения статусов домашек, отправленные студентам.
+    По ним после перезапуска восстанавливается снимок в памяти,
+    из которого бот отвечает на команды /status и /history.
+    """
+
+    def __init__(self, path):
+        """Открывает или создаёт базу path."""
+        self.lock = threading.Lock()
+        self.connection = connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS history ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'tenant_id TEXT NOT NULL, '
+            'homework_id, '
+            'name TEXT NOT NULL, '
+            'status TEXT NOT NULL, '
+            'date TEXT)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS history_tenant '
+            'ON history (tenant_id, id)'
+        )
+
+    def add(self, tenant_id, homework):
+        """Записывает изменение статуса домашки."""
+        with self.lock:
+            self.connection.execute(
+                'INSERT INTO history '
+                '(tenant_id, homework_id, name, status, date) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (tenant_id, homework.id, homework.name,
+                 homework.status, homework.date),
+            )
+
+    def add_many(self, changes):
+        """Записывает пары (tenant_id, Homework) одной транзакцией."""
+        with self.lock:
+            try:
+                self.connection.execute('BEGIN')
+                self.connection.executemany(
+                    'INSERT INTO history '
+                    '(tenant_id, homework_id, name, status, date) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    [(tenant_id, homework.id, homework.name,
+                      homework.status, homework.date)
+                     for tenant_id, homework in changes],
+                )
+                self.connection.execute('COMMIT')
+            except sqlite3.Error:
+                if self.connection.in_transaction:
+                    self.connection.execute('ROLLBACK')
+                raise
+
+    def load_all(self):
+        """Все изменения по порядку: пары (tenant_id, Homework)."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT tenant_id, homework_id, name, status, date '
+                'FROM history ORDER BY id'
+            ).fetchall()
+        return [(row[0], Homework(*row[1:])) for row in rows]
+
+    def load(self, tenant_id):
+        """Изменения одного студента по порядку."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT homework_id, name, status, date FROM history '
+                'WHERE tenant_id = ? ORDER BY id',
+                (tenant_id,),
+            ).fetchall()
+        return [Homework(*row) for row in rows]
+
+    def trim(self, keep):
+        """Оставляет у каждого студента keep последних изменений."""
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM history WHERE id IN ('
+                'SELECT old.id FROM history AS old WHERE ('
+                'SELECT COUNT(*) FROM history AS new '
+                'WHERE new.tenant_id = old.tenant_id AND new.id > old.id'
+                ') >= ?)',
+                (keep,),
+            )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self.lock:
+            self.connection.close()
+
+
+class LeaseStore:
+    """Аренда студентов узлами в общей базе SQLite.
+    Узел, который опрашивает студента, держит его аренду и
+    продлевает её, пока жив. Истёкшую аренду может забрать любой
+    другой узел. Годится для узлов на одной машине и для тестов;
+    другое хранилище должно реализовать те же методы.
+    """
+
+    def __init__(self, path, clock=time.time):
+        """Открывает или создаёт базу path."""
+        self.lock = threading.Lock()
+        self.connection = connect(path)
+        self.clock = clock
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS nodes ('
+            'node_id TEXT PRIMARY KEY, '
+            'expires REAL NOT NULL)'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            'tenant_id TEXT PRIMARY KEY, '
+            'owner TEXT NOT NULL, '
+            'expires REAL NOT NULL)'
+        )
+
+    def heartbeat(self, node_id, ttl):
+        """Продлевает узел и его аренды на ttl секунд.
+        Возвращает число живых узлов и множество студентов узла.
+        """
+        now = self.clock()
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                self.connection.execute(
+                    'INSERT INTO nodes (node_id, expires) VALUES (?, ?) '
+                    'ON CONFLICT (node_id) DO UPDATE SET '
+                    'expires = excluded.expires',
+                    (node_id, now + ttl),
+                )
+                self.connection.execute(
+                    'DELETE FROM nodes WHERE expires <= ?', (now,)
+                )
+                self.connection.execute(
+                    'UPDATE leases SET expires = ? '
+                    'WHERE owner = ? AND expires > ?',
+                    (now + ttl, node_id, now),
+                )
+                nodes = self.connection.execute(
+                    'SELECT COUNT(*) FROM nodes WHERE expires > ?', (now,)
+                ).fetchone()[0]
+                owned = self.connection.execute(
+                    'SELECT tenant_id FROM leases '
+                    'WHERE owner = ? AND expires > ?',
+                    (node_id, now),
+                ).fetchall()
+            finally:
+                self.connection.execute('COMMIT')
+        return nodes, {row[0] for row in owned}
+
+    def acquire(self, node_id, tenant_ids, ttl, limit=None):
+        """Берёт свободные или истёкшие аренды, возвращает полученные.
+        Студенты перебираются по порядку, берётся не больше limit.
+        """
+        now = self.clock()
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                taken = {
+                    row[0] for row in self.connection.execute(
+                        'SELECT tenant_id FROM leases WHERE expires > ?',
+                        (now,),
+                    )
+                }
+                acquired = [
+                    tenant_id for tenant_id in tenant_ids
+                    if tenant_id not in taken
+                ][:limit]
+                self.connection.executemany(
+                    'INSERT INTO leases (tenant_id, owner, expires) '
+                    'VALUES (?, ?, ?) '
+                    'ON CONFLICT (tenant_id) DO UPDATE SET '
+                    'owner = excluded.owner, expires = excluded.expires',
+                    [(tenant, node_id, now + ttl) for tenant in acquired],
+                )
+            finally:
+                self.connection.execute('COMMIT')
+        return acquired
+
+    def release(self, node_id, tenant_ids=None):
+        """Отдаёт аренды узла: перечисленные или все вместе с узлом."""
+        with self.lock:
+            if tenant_ids is None:
+                self.connection.execute(
+                    'DELETE FROM leases WHERE owner = ?', (node_id,)
+                )
+                self.connection.execute(
+                    'DELETE FROM nodes WHERE node_id = ?', (node_id,)
+                )
+                return
+            self.connection.executemany(
+                'DELETE FROM leases WHERE owner = ? AND tenant_id = ?',
+                [(node_id, tenant_id) for tenant_id in tenant_ids],
+            )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self.lock:
+            self.connection.close()
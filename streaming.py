@@ -0,0 +1,112 @@
+"""Потоковый разбор ответа API без загрузки его целиком в память."""
+import codecs
+import json
+
+WHITESPACE = ' \t\n\r'
+
+
+class StreamingObjectParser:
+    """Разбирает JSON-объект верхнего уровня по мере получения данных.
+    Элементы массива под ключом array_key выдаются по одному из
+    items(), остальные ключи верхнего уровня собираются в values.
+    В памяти одновременно держится только текущий элемент и
+    недочитанный кусок ответа.
+    """
+
+    def __init__(self, chunks, array_key):
+        """Куски ответа chunks приходят в байтах."""
+        self.chunks = iter(chunks)
+        self.array_key = array_key
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.exhausted = False
+        self.bytes_read = 0
+        self.found_array = False
+        self.values = {}
+
+    def read_more(self):
+        """Дочитывает следующий кусок ответа в буфер."""
+        if self.exhausted:
+            raise json.JSONDecodeError(
+                'Unexpected end of data', self.buffer, len(self.buffer)
+            )
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self.exhausted = True
+            self.buffer += self.text_decoder.decode(b'', final=True)
+            return
+        self.bytes_read += len(chunk)
+        self.buffer += self.text_decoder.decode(chunk)
+
+    def peek(self):
+        """Первый значащий символ после пробелов."""
+        while True:
+            while (self.pos < len(self.buffer)
+                   and self.buffer[self.pos] in WHITESPACE):
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            self.read_more()
+
+    def expect(self, symbols):
+        """Забирает один из ожидаемых символов."""
+        symbol = self.peek()
+        if symbol not in symbols:
+            raise json.JSONDecodeError(
+                f'Expected one of {symbols!r}', self.buffer, self.pos
+            )
+        self.pos += 1
+        return symbol
+
+    def value(self):
+        """Читает очередное JSON-значение целиком.
+        Значение, которое заканчивается ровно на конце буфера, может
+        быть обрезанным числом, поэтому перед ним дочитываются данные.
+        """
+        self.peek()
+        while True:
+            try:
+                result, end = self.decoder.raw_decode(self.buffer, self.pos)
+                if end < len(self.buffer) or self.exhausted:
+                    self.pos = end
+                    return result
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self.read_more()
+
+    def start(self):
+        """Проверяет, что ответ — объект."""
+        if self.peek() != '{':
+            raise TypeError('Ответ сервера не является словарем!')
+        self.pos += 1
+
+    def items(self):
+        """Элементы массива array_key по одному."""
+        self.start()
+        if self.peek() == '}':
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            if key == self.array_key:
+                if self.peek() != '[':
+                    raise TypeError('Домашка с сервера не является списком!')
+                self.pos += 1
+                self.found_array = True
+                if self.peek() == ']':
+                    self.pos += 1
+                else:
+                    while True:
+                        yield self.value()
+                        if self.expect(',]') == ']':
+                            break
+            else:
+                self.values[key] = self.value()
+            if self.expect(',}') == '}':
+                return
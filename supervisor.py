@@ -0,0 +1,191 @@
+"""Несколько процессов опроса на одной машине."""
+import bisect
+import logging
+import multiprocessing
+import os
+import signal
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+RING_REPLICAS = 64
+
+
+class HashRing:
+    """Консистентное хеширование ключей по узлам.
+    У каждого узла replicas точек на кольце, поэтому при изменении
+    числа узлов на другой узел переезжает лишь около 1/N ключей.
+    """
+
+    def __init__(self, nodes, replicas=RING_REPLICAS):
+        """Кольцо из узлов nodes по replicas точек на узел."""
+        points = sorted(
+            (zlib.crc32(f'{node}:{replica}'.encode()), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        if not points:
+            raise ValueError('Hash ring needs at least one node')
+        self.hashes = [point for point, _ in points]
+        self.nodes = [node for _, node in points]
+
+    def node(self, key):
+        """Узел, которому принадлежит ключ."""
+        index = bisect.bisect(self.hashes, zlib.crc32(str(key).encode()))
+        return self.nodes[index % len(self.nodes)]
+
+
+def shard(tenants, index, workers):
+    """Студенты, которых опрашивает воркер index из workers."""
+    ring = HashRing(range(workers))
+    return [
+        tenant for tenant in tenants if ring.node(tenant.tenant_id) == index
+    ]
+
+
+class Supervisor:
+    """Держит workers дочерних процессов target(index, workers).
+    Упавший воркер перезапускается, при частых падениях пауза перед
+    перезапуском растёт вдвое до max_restart_delay. SIGTTIN добавляет
+    воркер, SIGTTOU убирает: воркеры перезапускаются с новым
+    разбиением студентов. SIGUSR2 пересылается всем воркерам,
+    SIGTERM и SIGINT останавливают их. По умолчанию воркеры
+    запускаются через forkserver: их форкает отдельный чистый
+    процесс, а не супервизор с потоками логов и команд и открытыми
+    соединениями SQLite. Поэтому target должен импортироваться
+    по имени.
+    """
+
+    def __init__(self, target, workers, restart_delay=1,
+                 max_restart_delay=60, stable_time=60, stop_timeout=10,
+                 context=None, clock=time.monotonic):
+        """Держит workers процессов target.
+        Упавший процесс перезапускается с паузой от restart_delay
+        до max_restart_delay секунд.
+        """
+        self.target = target
+        self.workers = max(1, workers)
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_time = stable_time
+        self.stop_timeout = stop_timeout
+        self.context = context or multiprocessing.get_context('forkserver')
+        self.clock = clock
+        self.processes = {}
+        self.started = {}
+        self.crashes = {}
+        self.next_start = {}
+        self.signals = []
+        self.stopping = False
+
+    def spawn(self, index):
+        """Запускает воркер index."""
+        process = self.context.Process(
+            target=self.target,
+            args=(index, self.workers),
+            name=f'homework-worker-{index}',
+        )
+        process.start()
+        self.processes[index] = process
+        self.started[index] = self.clock()
+        logger.info(
+            f'Worker {index}/{self.workers} started, pid {process.pid}'
+        )
+
+    def reap(self, index):
+        """Убирает завершившийся воркер и планирует его перезапуск."""
+        process = self.processes.pop(index)
+        now = self.clock()
+        if now - self.started[index] >= self.stable_time:
+            self.crashes[index] = 0
+        crashes = self.crashes.get(index, 0)
+        delay = min(self.max_restart_delay, self.restart_delay * 2 ** crashes)
+        self.crashes[index] = crashes + 1
+        self.next_start[index] = now + delay
+        logger.error(
+            f'Worker {index} exited with code {process.exitcode}, '
+            f'restarting in {delay}s'
+        )
+
+    def check(self):
+        """Перезапускает упавшие воркеры, когда подошла их очередь."""
+        for index in range(self.workers):
+            process = self.processes.get(index)
+            if process is not None:
+                if process.is_alive():
+                    continue
+                self.reap(index)
+            if self.clock() >= self.next_start.get(index, 0):
+                self.spawn(index)
+
+    def stop_workers(self):
+        """Останавливает все воркеры, зависшие добиваются SIGKILL."""
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = self.clock() + self.stop_timeout
+        for process in self.processes.values():
+            process.join(max(0, deadline - self.clock()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self.processes = {}
+
+    def resize(self, workers):
+        """Меняет число воркеров и перераспределяет студентов."""
+        workers = max(1, workers)
+        if workers == self.workers:
+            return
+        logger.info(f'Resizing from {self.workers} to {workers} workers')
+        self.stop_workers()
+        self.workers = workers
+        self.crashes = {}
+        self.next_start = {}
+
+    def forward(self, signum):
+        """Пересылает сигнал всем живым воркерам."""
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    def handle(self, signum, frame):
+        """Запоминает сигнал, обработка идёт в основном цикле."""
+        self.signals.append(signum)
+
+    def process_signals(self):
+        """Обрабатывает сигналы, пришедшие с прошлого такта."""
+        while self.signals:
+            signum = self.signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                self.stopping = True
+            elif signum == signal.SIGTTIN:
+                self.resize(self.workers + 1)
+            elif signum == signal.SIGTTOU:
+                self.resize(self.workers - 1)
+            elif signum == signal.SIGUSR2:
+                self.forward(signum)
+
+    def run(self, interval=0.5):
+        """Запускает воркеры и следит за ними до сигнала остановки."""
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGTTIN,
+                       signal.SIGTTOU, signal.SIGUSR2):
+            signal.signal(signum, self.handle)
+        logger.info(f'Supervising {self.workers} workers')
+        try:
+            while True:
+                self.process_signals()
+                if self.stopping:
+                    break
+                self.check()
+                time.sleep(interval)
+        finally:
+            self.stop_workers()
+
+
+def reset_worker_signals(on_terminate):
+    """Сигналы дочернего процесса: обработчики супервизора не нужны."""
+    signal.signal(signal.SIGTERM, on_terminate)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    for signum in (signal.SIGTTIN, signal.SIGTTOU, signal.SIGUSR2):
+        signal.signal(signum, signal.SIG_IGN)
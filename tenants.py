@@ -0,0 +1,159 @@
+"""Студенты, за домашками которых следит бот."""
+import json
+import logging
+import os
+from collections import namedtuple
+from contextlib import closing
+
+from messages import DEFAULT_CATALOG
+
+logger = logging.getLogger(__name__)
+
+Tenant = namedtuple(
+    'Tenant',
+    ('tenant_id', 'practicum_token', 'chat_id', 'locale', 'template'),
+    defaults=(None, None),
+)
+
+TenantDiff = namedtuple('TenantDiff', ('added', 'removed', 'updated'))
+
+
+def load_tenants(path):
+    """Читает список студентов из JSON-файла.
+    Файл содержит список объектов с ключами
+    tenant_id, practicum_token и chat_id, а также
+    необязательными locale и template.
+    """
+    with open(path, encoding='utf-8') as tenants_file:
+        records = json.load(tenants_file)
+    if not isinstance(records, list):
+        raise TypeError('Файл со студентами должен содержать список!')
+    return [
+        Tenant(
+            tenant_id=str(record['tenant_id']),
+            practicum_token=record['practicum_token'],
+            chat_id=record['chat_id'],
+            locale=record.get('locale'),
+            template=record.get('template'),
+        )
+        for record in records
+    ]
+
+
+def load_tenants_db(path):
+    """Читает список студентов из таблицы tenants базы SQLite.
+    Колонки те же, что ключи в JSON-файле студентов.
+    """
+    import sqlite3
+
+    with closing(sqlite3.connect(path)) as connection:
+        rows = connection.execute(
+            'SELECT tenant_id, practicum_token, chat_id, locale, template '
+            'FROM tenants ORDER BY tenant_id'
+        ).fetchall()
+    return [
+        Tenant(str(tenant_id), token, chat_id, locale, template)
+        for tenant_id, token, chat_id, locale, template in rows
+    ]
+
+
+def valid_tenants(tenants, catalog=DEFAULT_CATALOG):
+    """Студенты с токеном, чатом и корректным шаблоном.
+    Остальные пропускаются с ошибкой в логе. Если tenant_id
+    повторяется, действует последняя запись.
+    """
+    valid = {}
+    for tenant in tenants:
+        if not tenant.practicum_token or not tenant.chat_id:
+            logger.error(
+                f'Tenant {tenant.tenant_id} skipped: '
+                'practicum_token or chat_id is missing'
+            )
+            continue
+        if tenant.template:
+            try:
+                catalog.custom_template(tenant.template)
+            except ValueError as error:
+                logger.error(
+                    f'Tenant {tenant.tenant_id} skipped: '
+                    f'invalid template: {error}'
+                )
+                continue
+        valid[tenant.tenant_id] = tenant
+    return list(valid.values())
+
+
+class TenantRegistry:
+    """Список студентов, который перечитывается при изменении источника.
+    Источник — файл или база SQLite, loader читает из него список
+    студентов, select оставляет студентов этого процесса. Изменение
+    замечается по времени изменения и размеру файла, для SQLite
+    учитывается и журнал -wal.
+    """
+
+    def __init__(self, path, loader=load_tenants, select=None):
+        """Студенты читаются из path функцией loader.
+        Функция select оставляет только нужных этому процессу.
+        """
+        self.path = path
+        self.loader = loader
+        self.select = select
+        self.version = None
+        self.tenants = {}
+
+    def stamp(self):
+        """Версия источника: время изменения и размер его файлов."""
+        stamps = []
+        for path in (self.path, f'{self.path}-wal'):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stamps.append(None)
+            else:
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamps)
+
+    def changed(self):
+        """Источник изменился с последнего чтения."""
+        return self.stamp() != self.version
+
+    def read(self):
+        """Читает источник и запоминает его версию."""
+        version = self.stamp()
+        tenants = self.loader(self.path)
+        if self.select is not None:
+            tenants = self.select(tenants)
+        self.version = version
+        return valid_tenants(tenants)
+
+    def load(self):
+        """Первое чтение: список студентов."""
+        tenants = self.read()
+        self.tenants = {tenant.tenant_id: tenant for tenant in tenants}
+        return tenants
+
+    def reload(self):
+        """Перечитывает источник, если он изменился.
+        Возвращает TenantDiff с добавленными, удалёнными и изменёнными
+        студентами или None, если источник не менялся.
+        """
+        if not self.changed():
+            return None
+        tenants = {tenant.tenant_id: tenant for tenant in self.read()}
+        diff = TenantDiff(
+            added=[
+                tenant for tenant_id, tenant in tenants.items()
+                if tenant_id not in self.tenants
+            ],
+            removed=[
+                tenant for tenant_id, tenant in self.tenants.items()
+                if tenant_id not in tenants
+            ],
+            updated=[
+                tenant for tenant_id, tenant in tenants.items()
+                if tenant_id in self.tenants
+                and self.tenants[tenant_id] != tenant
+            ],
+        )
+        self.tenants = tenants
+        return diff
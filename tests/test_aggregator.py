@@ -0,0 +1,112 @@
+import asyncio
+
+import requests
+
+from utils import FakeClock
+
+
+class TestErrorAggregator:
+
+    def test_one_digest_per_window(self):
+        from aggregator import ErrorAggregator
+        from exceptions import ExceptionNonInspectedError, ExceptionNot200Error
+
+        clock = FakeClock()
+        errors = ErrorAggregator(window=60, repeat_after=600, clock=clock)
+        for _ in range(50):
+            errors.record('1', ExceptionNonInspectedError('timeout'))
+            errors.record('1', ExceptionNot200Error('500'))
+        errors.record('2', ExceptionNot200Error('502'))
+        assert errors.collect() == {}, (
+            'Проверьте, что сводка отправляется только по окончании окна'
+        )
+        clock.now += 60
+        assert errors.collect() == {
+            '1': [('ExceptionNonInspectedError', 50, 'timeout'),
+                  ('ExceptionNot200Error', 50, '500')],
+            '2': [('ExceptionNot200Error', 1, '502')],
+        }, 'Проверьте, что ошибки группируются по студенту и классу'
+
+    def test_repeated_errors_suppressed(self):
+        from aggregator import ErrorAggregator
+        from exceptions import ExceptionNot200Error
+
+        clock = FakeClock()
+        errors = ErrorAggregator(window=60, repeat_after=600, clock=clock)
+        for _ in range(10):
+            errors.record('1', ExceptionNot200Error('500'))
+            clock.now += 60
+            digests = errors.collect()
+            if clock.now == 60:
+                assert digests, 'Проверьте, что первая сводка отправляется'
+            else:
+                assert digests == {}, (
+                    'Проверьте, что повторная ошибка подавляется'
+                )
+        errors.record('1', ExceptionNot200Error('500'))
+        clock.now += 60
+        assert errors.collect(), (
+            'Проверьте, что ошибка снова сообщается через repeat_after'
+        )
+
+    def test_bounded_fingerprints(self):
+        from aggregator import ErrorAggregator
+
+        clock = FakeClock()
+        errors = ErrorAggregator(window=0, max_fingerprints=3, clock=clock)
+        for i in range(10):
+            errors.record(str(i), ValueError())
+            errors.collect()
+        assert len(errors.reported) == 3
+
+
+class TestEngineErrors:
+
+    def test_error_storm_costs_one_send(self, monkeypatch):
+        from aggregator import ErrorAggregator
+        from circuit import CircuitBreaker
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        calls = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            calls.append(1)
+            if len(calls) % 2:
+                raise requests.ConnectionError('timeout')
+            response = requests.Response()
+            response.status_code = 500
+            return response
+
+        class MockBot:
+
+            def __init__(self):
+                self.sent = []
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                self.sent.append(text)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = MockBot()
+        clock = FakeClock()
+        engine = PollingEngine(
+            bot, [Tenant('1', 'token', 1)],
+            errors=ErrorAggregator(window=60, clock=clock),
+            breaker=CircuitBreaker(failure_threshold=1000),
+        )
+
+        async def storm():
+            engine.start()
+            for _ in range(20):
+                await engine.poll_tenant(engine.states[0])
+                await engine.report_errors()
+            clock.now += 60
+            await engine.report_errors()
+            await engine.dispatcher.join()
+            await engine.stop()
+
+        asyncio.run(storm())
+        assert len(bot.sent) == 1, (
+            'Проверьте, что за окно отправляется одна сводка ошибок'
+        )
+        assert '(×10)' in bot.sent[0]
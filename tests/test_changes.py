@@ -0,0 +1,36 @@
+class TestChangeDetector:
+
+    def test_only_changed_homeworks(self):
+        from changes import ChangeDetector
+        from records import Homework
+
+        detector = ChangeDetector()
+        homeworks = [
+            Homework(2, 'b', 'reviewing'),
+            Homework(1, 'a', 'approved'),
+        ]
+        changed = detector.changed('t', homeworks)
+        assert [hw.id for hw in changed] == [1, 2], (
+            'Проверьте, что все домашки из ответа обрабатываются '
+            'от старых к новым'
+        )
+        for homework in changed:
+            detector.remember('t', homework)
+        homeworks[0] = Homework(2, 'b', 'approved')
+        assert detector.changed('t', homeworks) == [homeworks[0]], (
+            'Проверьте, что возвращаются только изменившиеся домашки'
+        )
+        assert detector.changed('other', homeworks), (
+            'Проверьте, что статусы хранятся отдельно для каждого студента'
+        )
+
+    def test_bounded_memory(self):
+        from changes import ChangeDetector
+        from records import Homework
+
+        detector = ChangeDetector(max_per_tenant=3)
+        for i in range(10):
+            detector.remember('t', Homework(i, str(i), 'approved'))
+        assert list(detector.known['t']) == [7, 8, 9], (
+            'Проверьте, что на студента хранится ограниченное число домашек'
+        )
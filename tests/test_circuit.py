@@ -0,0 +1,52 @@
+import pytest
+
+from utils import FakeClock
+
+
+def fail(status_code):
+    from exceptions import ExceptionNot200Error
+
+    raise ExceptionNot200Error('fail', status_code)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_and_recovers(self):
+        from circuit import CLOSED, OPEN, CircuitBreaker
+        from exceptions import ExceptionCircuitOpen, ExceptionNot200Error
+
+        clock = FakeClock()
+        breaker = CircuitBreaker(
+            failure_threshold=3, reset_timeout=60, clock=clock
+        )
+        for _ in range(3):
+            with pytest.raises(ExceptionNot200Error):
+                breaker.call(fail, 500)
+        assert breaker.state == OPEN
+        calls = []
+        with pytest.raises(ExceptionCircuitOpen):
+            breaker.call(calls.append, 1)
+        assert not calls, (
+            'Проверьте, что разомкнутый выключатель не пропускает запросы'
+        )
+        clock.now += 60
+        with pytest.raises(ExceptionNot200Error):
+            breaker.call(fail, 502)
+        assert breaker.state == OPEN, (
+            'Проверьте, что отказ пробного запроса снова размыкает выключатель'
+        )
+        clock.now += 60
+        assert breaker.call(lambda: 'ok') == 'ok'
+        assert breaker.state == CLOSED
+
+    def test_tenant_errors_do_not_open(self):
+        from circuit import CLOSED, CircuitBreaker
+        from exceptions import ExceptionNot200Error
+
+        breaker = CircuitBreaker(failure_threshold=1)
+        with pytest.raises(ExceptionNot200Error):
+            breaker.call(fail, 401)
+        assert breaker.state == CLOSED, (
+            'Проверьте, что ошибка токена одного студента '
+            'не выключает запросы для всех'
+        )
@@ -0,0 +1,105 @@
+import asyncio
+
+import requests
+
+from utils import FakeClock
+
+
+class TestPack:
+
+    def test_split_on_line_boundaries(self):
+        from coalesce import split_text
+
+        text = 'first line\nsecond line\nthird'
+        pieces = split_text(text, 15)
+        assert pieces == ['first line', 'second line', 'third'], (
+            'Проверьте, что длинный текст режется по переводам строк'
+        )
+
+    def test_split_counts_utf16(self):
+        from coalesce import split_text, text_length
+
+        pieces = split_text('😀' * 5, 4)
+        assert pieces == ['😀😀', '😀😀', '😀'], (
+            'Проверьте, что длина считается в UTF-16 и символы не режутся'
+        )
+        assert all(text_length(piece) <= 4 for piece in pieces)
+
+    def test_pack_keeps_indices(self):
+        from coalesce import pack
+
+        parts = pack(['a' * 4, 'b' * 4, 'c' * 10], max_length=10)
+        assert parts == [
+            ('aaaa\n\nbbbb', [0, 1]),
+            ('c' * 10, [2]),
+        ], 'Проверьте, что тексты склеиваются, пока помещаются в сообщение'
+        assert [indices for _, indices in pack(['x' * 25], 10)] == [
+            [0], [0], [0]
+        ]
+
+
+class TestCoalescer:
+
+    def test_window(self):
+        from coalesce import Coalescer
+
+        clock = FakeClock(1000.0)
+        coalescer = Coalescer(window=5, clock=clock)
+        coalescer.add(1, 'a')
+        coalescer.add(2, 'c')
+        clock.now += 3
+        coalescer.add(1, 'b')
+        assert coalescer.due() == []
+        clock.now += 2
+        assert coalescer.due() == [(1, 'a\n\nb'), (2, 'c')], (
+            'Проверьте, что уведомления чата за окно склеиваются'
+        )
+        assert len(coalescer) == 0
+
+    def test_one_message_per_poll(self, monkeypatch):
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        class MockResponse:
+            status_code = 200
+
+            def json(self):
+                return {'homeworks': [
+                    {'homework_name': f'hw{i}', 'status': 'approved'}
+                    for i in range(3)
+                ], 'current_date': 0}
+
+        class MockBot:
+
+            def __init__(self):
+                self.sent = []
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                self.sent.append(text)
+
+        monkeypatch.setattr(requests, 'get', lambda *a, **k: MockResponse())
+        bot = MockBot()
+        engine = PollingEngine(bot, [Tenant('1', 'token', 1)])
+
+        async def poll():
+            engine.start()
+            await engine.poll_tenant(engine.states[0])
+            await engine.dispatcher.join()
+            await engine.stop()
+
+        asyncio.run(poll())
+        assert len(bot.sent) == 1, (
+            'Проверьте, что изменения одного опроса уходят одним сообщением'
+        )
+        assert all(f'hw{i}' in bot.sent[0] for i in range(3))
+
+    def test_engine_keeps_given_coalescer(self):
+        from coalesce import Coalescer
+        from engine import PollingEngine
+
+        coalescer = Coalescer(max_length=10)
+        engine = PollingEngine(object(), [], coalescer=coalescer)
+        assert engine.coalescer is coalescer, (
+            'Проверьте, что движок использует переданный coalescer, '
+            'даже пустой'
+        )
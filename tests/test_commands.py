@@ -0,0 +1,115 @@
+class MockUpdater:
+
+    def __init__(self):
+        self.dispatcher = self
+        self.handlers = []
+
+    def add_handler(self, handler):
+        self.handlers.append(handler)
+
+
+class TestCommandServer:
+
+    def test_replies_from_snapshot(self, monkeypatch):
+        import requests
+        from commands import CommandServer
+        from engine import PollingEngine
+        from records import Homework
+        from tenants import Tenant
+
+        def fail_get(*args, **kwargs):
+            raise AssertionError('API не должен запрашиваться')
+
+        monkeypatch.setattr(requests, 'get', fail_get)
+        tenants = [Tenant('1', 'a', 10), Tenant('2', 'b', 20, locale='en')]
+        engine = PollingEngine(None, tenants)
+        engine.changes.remember('1', Homework(1, 'hw1', 'reviewing', 'd1'))
+        engine.changes.remember('1', Homework(1, 'hw1', 'approved', 'd2'))
+        server = CommandServer(
+            tenants, engine.changes, engine.catalog, updater=MockUpdater()
+        )
+        assert server.reply(10, 'homework') == (
+            '"hw1": Работа проверена: ревьюеру всё понравилось. Ура!'
+        ), 'Проверьте, что /status берёт последний статус из памяти'
+        assert server.reply(10, 'change').splitlines() == [
+            'd2 "hw1": Работа проверена: ревьюеру всё понравилось. Ура!',
+            'd1 "hw1": Работа взята на проверку ревьюером.',
+        ], 'Проверьте, что /history показывает изменения от новых к старым'
+        assert server.reply(20, 'homework') == (
+            'Nothing is known about your works yet.'
+        )
+        assert sorted(
+            command for handler in server.updater.handlers
+            for command in handler.command
+        ) == ['history', 'status']
+
+    def test_history_snapshot(self, tmp_path):
+        from commands import CommandServer, HistorySnapshot
+        from records import Homework
+        from storage import HistoryStore
+        from tenants import Tenant
+
+        store = HistoryStore(str(tmp_path / 'state.sqlite3'))
+        store.add('1', Homework(1, 'hw1', 'reviewing'))
+        store.add('2', Homework(2, 'hw2', 'rejected'))
+        store.add('1', Homework(1, 'hw1', 'approved'))
+        server = CommandServer(
+            [Tenant('1', 'a', 10, locale='en')], HistorySnapshot(store),
+            updater=MockUpdater(),
+        )
+        assert server.reply(10, 'homework') == (
+            '"hw1": The work is reviewed: the reviewer liked it. Hooray!'
+        ), 'Проверьте, что без движка ответ строится по таблице history'
+
+    def test_leases_reply_from_shared_history(self, monkeypatch, tmp_path):
+        import commands
+        import homework
+        from engine import PollingEngine
+        from records import Homework
+        from settings import Settings
+        from storage import HistoryStore
+        from tenants import Tenant
+
+        monkeypatch.setattr(
+            commands, 'Updater', lambda **kwargs: MockUpdater()
+        )
+        path = str(tmp_path / 'state.sqlite3')
+        tenants = [Tenant('1', 'a', 10, locale='en')]
+        engine = PollingEngine(None, tenants, history=HistoryStore(path))
+        HistoryStore(path).add('1', Homework(1, 'hw1', 'approved'))
+        server = homework.create_commands(
+            Settings({'LEASES': '1'}), tenants, engine
+        )
+        assert 'hw1' in server.reply(10, 'homework'), (
+            'Проверьте, что с LEASES команды отвечают по общей таблице '
+            'history, куда пишут другие узлы'
+        )
+
+    def test_reload_tenants(self, tmp_path):
+        import json
+        import os
+
+        from commands import CommandServer, HistorySnapshot
+        from records import Homework
+        from storage import HistoryStore
+        from tenants import TenantRegistry
+
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'tenant_id': 1, 'practicum_token': 'a', 'chat_id': 10},
+        ]))
+        registry = TenantRegistry(str(path))
+        store = HistoryStore(str(tmp_path / 'state.sqlite3'))
+        store.add('2', Homework(2, 'hw2', 'approved'))
+        server = CommandServer(
+            registry.load(), HistorySnapshot(store), updater=MockUpdater()
+        )
+        path.write_text(json.dumps([
+            {'tenant_id': 1, 'practicum_token': 'a', 'chat_id': 10},
+            {'tenant_id': 2, 'practicum_token': 'b', 'chat_id': 20},
+        ]))
+        os.utime(path, ns=(0, 0))
+        server.reload(registry)
+        assert 'hw2' in server.reply(20, 'homework'), (
+            'Проверьте, что команды видят студентов, добавленных на ходу'
+        )
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from utils import FakeClock
+
+
+class TestTokenBucket:
+
+    def test_rate(self):
+        from ratelimit import TokenBucket
+
+        clock = FakeClock()
+        bucket = TokenBucket(2, capacity=2, clock=clock)
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == pytest.approx(0.5), (
+            'Проверьте, что при пустой корзине возвращается время ожидания'
+        )
+        clock.now += 0.5
+        assert bucket.acquire() == 0
+
+
+class TestOutboundDispatcher:
+
+    def test_delivery_keeps_chat_order(self):
+        from dispatcher import OutboundDispatcher
+
+        delivered = []
+
+        async def deliver(chat_id, text):
+            await asyncio.sleep(0)
+            delivered.append((chat_id, text))
+
+        async def run():
+            dispatcher = OutboundDispatcher(
+                deliver, workers=3, global_rate=1000, chat_rate=1000
+            )
+            dispatcher.start()
+            for i in range(5):
+                for chat_id in (1, 2):
+                    dispatcher.enqueue(chat_id, i)
+            await dispatcher.join()
+            await dispatcher.stop()
+
+        asyncio.run(run())
+        for chat_id in (1, 2):
+            assert [text for chat, text in delivered if chat == chat_id] == [
+                0, 1, 2, 3, 4
+            ], 'Проверьте, что сообщения чата доставляются по порядку'
+
+    def test_queue_full(self):
+        from dispatcher import OutboundDispatcher
+        from exceptions import ExceptionQueueFull
+
+        async def deliver(chat_id, text):
+            pass
+
+        async def run():
+            dispatcher = OutboundDispatcher(deliver, workers=1, max_queue=1)
+            dispatcher.queues = [asyncio.Queue(maxsize=1)]
+            dispatcher.enqueue(1, 'a')
+            with pytest.raises(ExceptionQueueFull):
+                dispatcher.enqueue(1, 'b')
+
+        asyncio.run(run())
+
+    def test_split_record_waits_for_all_parts(self, tmp_path):
+        from dispatcher import OutboundDispatcher
+        from storage import OutboxStore
+
+        outbox = OutboxStore(str(tmp_path / 'state.sqlite3'), retry_base=0)
+        outbox.add('1', 'text')
+        outbox.flush()
+        [(message_id, _, _)] = outbox.claim()
+
+        async def deliver(chat_id, text):
+            if text == 'first':
+                raise RuntimeError('first part failed')
+
+        async def run():
+            dispatcher = OutboundDispatcher(
+                deliver, workers=1, global_rate=1000, chat_rate=1000,
+                outbox=outbox,
+            )
+            dispatcher.start()
+            dispatcher.enqueue_parts(
+                '1', [('first', [message_id]), ('second', [message_id])]
+            )
+            await dispatcher.join()
+            await dispatcher.stop()
+            return dispatcher
+
+        dispatcher = asyncio.run(run())
+        assert not dispatcher.in_flight and not dispatcher.parts
+        assert [row[0] for row in outbox.claim()] == [message_id], (
+            'Проверьте, что запись с упавшей частью отправляется повторно, '
+            'даже если следующая часть доставлена'
+        )
+
+    def test_outbox_errors_keep_worker(self, tmp_path):
+        import sqlite3
+
+        from dispatcher import OutboundDispatcher
+        from storage import OutboxStore
+
+        class LockedOutbox(OutboxStore):
+
+            def delivered(self, message_id):
+                raise sqlite3.OperationalError('database is locked')
+
+            def failed(self, message_id):
+                raise sqlite3.OperationalError('database is locked')
+
+        outbox = LockedOutbox(str(tmp_path / 'state.sqlite3'))
+        sent = []
+
+        async def deliver(chat_id, text):
+            sent.append(text)
+
+        async def run():
+            dispatcher = OutboundDispatcher(
+                deliver, workers=1, global_rate=1000, chat_rate=1000,
+                outbox=outbox,
+            )
+            dispatcher.start()
+            dispatcher.enqueue('1', 'first', [1])
+            dispatcher.enqueue('1', 'second', [2])
+            await asyncio.wait_for(dispatcher.join(), 1)
+            alive = not dispatcher.tasks[0].done()
+            await dispatcher.stop()
+            return alive
+
+        assert asyncio.run(run()), (
+            'Проверьте, что ошибка outbox не останавливает воркер'
+        )
+        assert sent == ['first', 'second'], (
+            'Проверьте, что отправленное сообщение не отправляется повторно'
+        )
@@ -0,0 +1,331 @@
+import asyncio
+import json
+
+import requests
+
+
+class MockResponse:
+
+    def __init__(self, homeworks):
+        self.status_code = 200
+        self.homeworks = homeworks
+
+    def json(self):
+        return {'homeworks': self.homeworks, 'current_date': 0}
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestPollingEngine:
+
+    def test_load_tenants(self, tmp_path):
+        from tenants import load_tenants
+
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'tenant_id': 1, 'practicum_token': 'a', 'chat_id': 10},
+            {'tenant_id': 2, 'practicum_token': 'b', 'chat_id': 20},
+        ]))
+        tenants = load_tenants(str(path))
+        assert [t.tenant_id for t in tenants] == ['1', '2'], (
+            'Проверьте, что студенты читаются из файла'
+        )
+
+    def test_poll_each_tenant(self, monkeypatch):
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        seen_headers = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            seen_headers.append(headers['Authorization'])
+            return MockResponse(
+                [{'homework_name': 'hw', 'status': 'approved'}]
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = MockBot()
+        tenants = [Tenant(str(i), f'token{i}', i) for i in range(5)]
+        engine = PollingEngine(bot, tenants, concurrency=2)
+
+        async def poll_twice():
+            engine.start()
+            for _ in range(2):
+                await asyncio.gather(
+                    *(engine.poll_tenant(state) for state in engine.states)
+                )
+                await engine.dispatcher.join()
+            await engine.stop()
+
+        asyncio.run(poll_twice())
+        assert sorted(seen_headers) == sorted(
+            f'OAuth token{i}' for i in range(5) for _ in range(2)
+        ), 'Проверьте, что каждый студент опрашивается со своим токеном'
+        assert sorted(chat for chat, _ in bot.sent) == list(range(5)), (
+            'Проверьте, что повторное сообщение не отправляется'
+        )
+
+    def test_session_with_timeouts(self):
+        from engine import PollingEngine
+        from settings import get_settings
+        from tenants import Tenant
+
+        class MockSession:
+            calls = []
+
+            def get(self, url, **kwargs):
+                self.calls.append(kwargs)
+                return MockResponse([])
+
+            def close(self):
+                pass
+
+        session = MockSession()
+        engine = PollingEngine(
+            MockBot(), [Tenant('1', 'token', 1)], session=session
+        )
+
+        async def poll():
+            engine.start()
+            await engine.poll_tenant(engine.states[0])
+            await engine.stop()
+
+        asyncio.run(poll())
+        settings = get_settings()
+        assert session.calls[0]['timeout'] == (
+            settings.API_CONNECT_TIMEOUT, settings.API_READ_TIMEOUT
+        ), 'Проверьте, что запрос к API идёт через сессию с таймаутами'
+
+    def test_create_session_pool(self):
+        import homework
+
+        session = homework.create_session(pool_maxsize=7)
+        adapter = session.get_adapter(homework.ENDPOINT)
+        assert adapter._pool_maxsize == 7, (
+            'Проверьте размер пула соединений'
+        )
+        session.close()
+
+    def test_from_date_watermark(self, monkeypatch, tmp_path):
+        from engine import PollingEngine
+        from storage import WatermarkStore
+        from tenants import Tenant
+
+        requested = []
+
+        class DatedResponse(MockResponse):
+
+            def json(self):
+                return {'homeworks': [], 'current_date': 500}
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            requested.append(params['from_date'])
+            return DatedResponse([])
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        store = WatermarkStore(str(tmp_path / 'state.sqlite3'))
+        store.advance('1', 100)
+        engine = PollingEngine(
+            MockBot(), [Tenant('1', 'token', 1)], watermarks=store
+        )
+
+        async def poll_twice():
+            engine.start()
+            for _ in range(2):
+                await engine.poll_tenant(engine.states[0])
+            await engine.stop()
+
+        asyncio.run(poll_twice())
+        assert requested == [100, 500], (
+            'Проверьте, что from_date берётся из сохранённой отметки'
+        )
+        assert store.get('1') == 500
+
+    def test_outbox_retries_failed_delivery(self, monkeypatch, tmp_path):
+        import telegram
+        from engine import PollingEngine
+        from storage import OutboxStore
+        from tenants import Tenant
+
+        class FlakyBot(MockBot):
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if not self.sent:
+                    self.sent.append(None)
+                    raise telegram.error.NetworkError('Timed out')
+                super().send_message(chat_id, text)
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            return MockResponse([{'homework_name': 'hw', 'status': 'approved'}])
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = FlakyBot()
+        outbox = OutboxStore(str(tmp_path / 'state.sqlite3'), retry_base=0)
+        engine = PollingEngine(bot, [Tenant('1', 'token', 1)], outbox=outbox)
+
+        async def poll_and_drain():
+            engine.start()
+            await engine.poll_tenant(engine.states[0])
+            for _ in range(2):
+                await engine.drain()
+                await engine.dispatcher.join()
+            await engine.stop()
+
+        asyncio.run(poll_and_drain())
+        assert bot.sent[1:] == [('1', bot.sent[1][1])], (
+            'Проверьте, что недоставленное уведомление отправляется повторно'
+        )
+        assert outbox.claim() == []
+
+    def test_history_restored_after_restart(self, monkeypatch, tmp_path):
+        from engine import PollingEngine
+        from storage import HistoryStore
+        from tenants import Tenant
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            return MockResponse([{'homework_name': 'hw', 'status': 'approved'}])
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        path = str(tmp_path / 'state.sqlite3')
+        tenants = [Tenant('1', 'token', 1)]
+        engine = PollingEngine(MockBot(), tenants, history=HistoryStore(path))
+
+        async def poll():
+            engine.start()
+            await engine.poll_tenant(engine.states[0])
+            await engine.stop()
+
+        asyncio.run(poll())
+        restarted = PollingEngine(
+            MockBot(), tenants, history=HistoryStore(path)
+        )
+        assert [hw.status for hw in restarted.changes.history('1')] == [
+            'approved'
+        ], 'Проверьте, что изменения статусов сохраняются и восстанавливаются'
+
+    def test_history_waits_for_outbox(self, monkeypatch, tmp_path):
+        import sqlite3
+
+        from engine import PollingEngine
+        from storage import HistoryStore, OutboxStore
+        from tenants import Tenant
+
+        class LockedOutbox(OutboxStore):
+
+            def flush(self):
+                raise sqlite3.OperationalError('database is locked')
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            return MockResponse([{'homework_name': 'hw', 'status': 'approved'}])
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        path = str(tmp_path / 'state.sqlite3')
+        history = HistoryStore(path)
+        engine = PollingEngine(
+            MockBot(), [Tenant('1', 'token', 1)],
+            outbox=LockedOutbox(path), history=history,
+        )
+
+        async def poll():
+            engine.start()
+            await engine.poll_and_reschedule(engine.states[0])
+            engine.outbox = None
+            await engine.dispatcher.stop()
+
+        asyncio.run(poll())
+        assert history.load('1') == [], (
+            'Проверьте, что изменение попадает в history только после '
+            'записи уведомления в outbox'
+        )
+
+    def test_outbox_errors_keep_engine_running(self, tmp_path):
+        import sqlite3
+
+        from engine import PollingEngine
+        from scheduler import TimingWheel
+        from storage import OutboxStore
+
+        class LockedOutbox(OutboxStore):
+
+            def claim(self, *args, **kwargs):
+                self.claims = getattr(self, 'claims', 0) + 1
+                raise sqlite3.OperationalError('database is locked')
+
+        outbox = LockedOutbox(str(tmp_path / 'state.sqlite3'))
+        engine = PollingEngine(MockBot(), [], outbox=outbox)
+        engine.wheel = TimingWheel(tick=0.01)
+
+        async def run():
+            try:
+                await asyncio.wait_for(engine.run(), 0.2)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(run())
+        assert outbox.claims > 1, (
+            'Проверьте, что ошибка базы outbox не останавливает опрос'
+        )
+
+    def test_drain_releases_rows_without_room(self, tmp_path):
+        from coalesce import Coalescer
+        from dispatcher import OutboundDispatcher
+        from engine import PollingEngine
+        from storage import OutboxStore
+
+        async def deliver(chat_id, text):
+            pass
+
+        outbox = OutboxStore(str(tmp_path / 'state.sqlite3'))
+        outbox.add('1', 'long text ' * 3)
+        dispatcher = OutboundDispatcher(deliver, workers=1, outbox=outbox)
+        engine = PollingEngine(
+            MockBot(), [], outbox=outbox, dispatcher=dispatcher,
+            coalescer=Coalescer(max_length=10),
+        )
+
+        async def drain():
+            dispatcher.queues = [asyncio.Queue(maxsize=1)]
+            await engine.drain()
+
+        asyncio.run(drain())
+        assert [row[1] for row in outbox.claim()] == ['1'], (
+            'Проверьте, что сообщения, не поместившиеся в очередь, сразу '
+            'возвращаются в outbox'
+        )
+
+    def test_sigterm_stops_engine(self):
+        import os
+        import signal
+
+        from engine import PollingEngine
+
+        class Session:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        session = Session()
+        engine = PollingEngine(MockBot(), [], session=session)
+
+        async def run():
+            asyncio.get_running_loop().call_later(
+                0.05, os.kill, os.getpid(), signal.SIGTERM
+            )
+            await engine.run()
+
+        try:
+            asyncio.run(run())
+        except asyncio.CancelledError:
+            pass
+        assert session.closed, (
+            'Проверьте, что по SIGTERM движок останавливается и закрывает '
+            'сессию'
+        )
@@ -0,0 +1,86 @@
+import asyncio
+
+
+class TestHedgedCaller:
+
+    def make_caller(self):
+        from hedging import HedgedCaller, LatencyTracker
+
+        tracker = LatencyTracker(window=8, refresh=4)
+        for _ in range(4):
+            tracker.record(0.01)
+        return HedgedCaller(percentile=95, min_delay=0.01, tracker=tracker)
+
+    def test_slow_request_is_hedged(self):
+        caller = self.make_caller()
+        delays = [1.0, 0.0]
+        cancelled = []
+
+        async def make_call():
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        result = asyncio.run(caller.run(make_call))
+        assert result == 0.0, 'Проверьте, что побеждает первый ответ'
+        assert cancelled == [1.0], (
+            'Проверьте, что проигравший запрос отменяется'
+        )
+        assert caller.stats == {
+            'requests': 1, 'hedged': 1, 'hedge_wins': 1
+        }
+
+    def test_fast_request_is_not_hedged(self):
+        caller = self.make_caller()
+        calls = []
+
+        async def make_call():
+            calls.append(1)
+            return 'ok'
+
+        assert asyncio.run(caller.run(make_call)) == 'ok'
+        assert len(calls) == 1
+        assert caller.stats['hedged'] == 0
+
+    def test_failed_hedge_waits_for_other(self):
+        caller = self.make_caller()
+        attempts = []
+
+        async def make_call():
+            attempts.append(1)
+            if len(attempts) == 2:
+                raise RuntimeError('hedge failed')
+            await asyncio.sleep(0.05)
+            return 'first'
+
+        assert asyncio.run(caller.run(make_call)) == 'first', (
+            'Проверьте, что ошибка дубля не отменяет исходный запрос'
+        )
+
+    def test_success_wins_when_both_finish_together(self, monkeypatch):
+        caller = self.make_caller()
+        attempts = []
+        real_wait = asyncio.wait
+
+        async def late_wait(futures, **kwargs):
+            if kwargs.get('return_when') == asyncio.FIRST_COMPLETED:
+                await asyncio.sleep(0.05)
+            return await real_wait(futures, **kwargs)
+
+        async def make_call():
+            attempts.append(1)
+            number = len(attempts)
+            await asyncio.sleep(0.03)
+            if number == 1:
+                raise RuntimeError('first failed')
+            return 'second'
+
+        monkeypatch.setattr(asyncio, 'wait', late_wait)
+        assert asyncio.run(caller.run(make_call)) == 'second', (
+            'Проверьте, что из одновременно завершившихся запросов '
+            'выбирается успешный'
+        )
@@ -0,0 +1,103 @@
+import asyncio
+
+import requests
+
+from utils import FakeClock
+
+
+class TestLeaseManager:
+
+    def managers(self, tmp_path, clock, count, tenants=10):
+        from leases import LeaseManager
+        from storage import LeaseStore
+
+        store = LeaseStore(str(tmp_path / 'leases.sqlite3'), clock=clock)
+        tenant_ids = [str(i) for i in range(tenants)]
+        return [
+            LeaseManager(store, f'node{i}', tenant_ids, ttl=30, clock=clock)
+            for i in range(count)
+        ]
+
+    def test_fair_share_without_overlap(self, tmp_path):
+        clock = FakeClock(1000.0)
+        first, second = self.managers(tmp_path, clock, 2)
+        assert len(first.heartbeat()) == 10, (
+            'Проверьте, что единственный узел берёт всех студентов'
+        )
+        second.heartbeat()
+        first.heartbeat()
+        second.heartbeat()
+        assert len(first.owned) == len(second.owned) == 5, (
+            'Проверьте, что при новом узле студенты делятся поровну'
+        )
+        assert not first.owned & second.owned, (
+            'Проверьте, что студента опрашивает только один узел'
+        )
+
+    def test_failover(self, tmp_path):
+        clock = FakeClock(1000.0)
+        first, second = self.managers(tmp_path, clock, 2)
+        first.heartbeat()
+        second.heartbeat()
+        first.heartbeat()
+        second.heartbeat()
+        clock.now += 31
+        assert not first.owns(next(iter(first.owned))), (
+            'Проверьте, что узел без продления аренды перестаёт опрашивать'
+        )
+        assert len(second.heartbeat()) == 10, (
+            'Проверьте, что студенты упавшего узла переходят к живому'
+        )
+
+    def test_release_on_stop(self, tmp_path):
+        clock = FakeClock(1000.0)
+        first, second = self.managers(tmp_path, clock, 2)
+        first.heartbeat()
+        first.release()
+        assert len(second.heartbeat()) == 10
+
+    def test_set_tenants_releases_removed(self, tmp_path):
+        clock = FakeClock(1000.0)
+        first, second = self.managers(tmp_path, clock, 2)
+        first.heartbeat()
+        first.set_tenants(['0', '1'])
+        assert first.owned == {'0', '1'}
+        assert len(second.heartbeat() - first.owned) == 5, (
+            'Проверьте, что аренда удалённых студентов отдаётся сразу'
+        )
+
+
+class TestEngineLeases:
+
+    def test_polls_only_owned_tenants(self, monkeypatch):
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        polled = []
+
+        class OwnsFirst:
+
+            def owns(self, tenant_id):
+                return tenant_id == '1'
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            polled.append(headers['Authorization'])
+            raise requests.ConnectionError
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        engine = PollingEngine(
+            None, [Tenant('1', 'a', 1), Tenant('2', 'b', 2)],
+            leases=OwnsFirst(),
+        )
+
+        async def poll_all():
+            engine.start()
+            for state in engine.states:
+                await engine.poll_and_reschedule(state)
+            engine.leases = None
+            await engine.stop()
+
+        asyncio.run(poll_all())
+        assert polled == ['OAuth a'], (
+            'Проверьте, что узел опрашивает только своих студентов'
+        )
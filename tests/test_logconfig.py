@@ -0,0 +1,45 @@
+import io
+import json
+import logging
+
+
+class TestLogging:
+
+    def setup_and_log(self, **kwargs):
+        from logconfig import request_id_var, setup_logging, tenant_id_var
+
+        stream = io.StringIO()
+        root = logging.getLogger()
+        old_handlers, old_level = list(root.handlers), root.level
+        listener = setup_logging(stream=stream, **kwargs)
+        try:
+            tenant_id_var.set('ivanov')
+            request_id_var.set('1f')
+            logger = logging.getLogger('homework')
+            for number in range(10):
+                logger.info('Request %s completed', number)
+            logger.error('Something failed')
+        finally:
+            listener.stop()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in old_handlers:
+                root.addHandler(handler)
+            root.setLevel(old_level)
+        return stream.getvalue().splitlines()
+
+    def test_json_with_context(self):
+        lines = self.setup_and_log(json_format=True)
+        assert len(lines) == 11, (
+            'Проверьте, что каждая запись выводится ровно один раз'
+        )
+        record = json.loads(lines[0])
+        assert record['msg'] == 'Request 0 completed'
+        assert record['tenant'] == 'ivanov'
+        assert record['request'] == '1f'
+
+    def test_sampling_keeps_errors(self):
+        lines = self.setup_and_log(sample_rate=0)
+        assert len(lines) == 1 and 'Something failed' in lines[0], (
+            'Проверьте, что сэмплируются только INFO-записи'
+        )
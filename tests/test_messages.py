@@ -0,0 +1,47 @@
+import pytest
+
+
+class TestMessageCatalog:
+
+    def test_locales(self):
+        from messages import MessageCatalog
+        from records import Homework
+
+        catalog = MessageCatalog()
+        homework = Homework(1, 'hw', 'approved')
+        assert catalog.status_message(homework).startswith(
+            'Изменился статус проверки работы "hw"'
+        ), 'Проверьте, что по умолчанию сообщения на русском'
+        assert catalog.status_message(homework, 'en').startswith(
+            'The review status of "hw" has changed.'
+        )
+        assert catalog.status_message(homework, 'xx') == (
+            catalog.status_message(homework)
+        ), 'Проверьте, что для неизвестного языка берётся язык по умолчанию'
+        assert catalog.error_message('boom', 'en') == 'Program error: boom'
+
+    def test_cached_and_custom_template(self):
+        from messages import MessageCatalog
+        from records import Homework
+
+        catalog = MessageCatalog()
+        homework = Homework(1, 'hw', 'rejected')
+        template = '$name: $status'
+        assert catalog.status_message(homework, template=template) == (
+            'hw: rejected'
+        )
+        catalog.status_message(homework, template=template)
+        assert catalog.render_status.cache_info().hits == 1, (
+            'Проверьте, что готовые сообщения кешируются'
+        )
+
+    def test_invalid_template(self):
+        from messages import MessageCatalog
+
+        with pytest.raises(ValueError):
+            MessageCatalog().custom_template('$unknown')
+        with pytest.raises(ValueError):
+            MessageCatalog({'ru': {
+                'status': '$name', 'error': '$error',
+                'verdicts': {'approved': 'ok'},
+            }})
@@ -0,0 +1,45 @@
+import requests
+
+
+class TestMetrics:
+
+    def test_histogram_render(self):
+        from metrics import Histogram
+
+        histogram = Histogram('test_seconds', 'Тест.', buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        lines = histogram.render()
+        assert 'test_seconds_bucket{le="0.1"} 1' in lines
+        assert 'test_seconds_bucket{le="1"} 2' in lines
+        assert 'test_seconds_bucket{le="+Inf"} 3' in lines, (
+            'Проверьте, что корзины гистограммы накопительные'
+        )
+        assert 'test_seconds_count 3' in lines
+
+    def test_counter_labels(self):
+        from metrics import Counter
+
+        counter = Counter('errors_total', 'Тест.', labelnames=('exception',))
+        counter.labels('ExceptionNot200Error').inc()
+        counter.labels('ExceptionNot200Error').inc()
+        assert 'errors_total{exception="ExceptionNot200Error"} 2' in (
+            counter.render()
+        )
+
+    def test_metrics_server(self):
+        from metrics import QUEUE_DEPTH, start_metrics_server
+
+        QUEUE_DEPTH.set_function(lambda: 7)
+        server = start_metrics_server(0)
+        try:
+            port = server.server_address[1]
+            body = requests.get(f'http://127.0.0.1:{port}/metrics').text
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert 'homework_bot_outbound_queue_depth 7' in body, (
+            'Проверьте, что метрики отдаются по HTTP'
+        )
+        assert '# TYPE homework_bot_api_request_seconds histogram' in body
@@ -0,0 +1,39 @@
+import pstats
+import time
+
+
+class TestLoopProfiler:
+
+    def run_iterations(self, profiler, count):
+        for _ in range(count):
+            profiler.tick()
+            sum(range(1000))
+            time.sleep(0.02)
+
+    def test_cprofile(self, tmp_path):
+        from profiling import LoopProfiler
+
+        profiler = LoopProfiler(str(tmp_path), iterations=2)
+        self.run_iterations(profiler, 2)
+        assert not list(tmp_path.iterdir()), (
+            'Проверьте, что без запроса профилирование не включается'
+        )
+        profiler.request()
+        self.run_iterations(profiler, 4)
+        files = list(tmp_path.iterdir())
+        assert len(files) == 1 and files[0].suffix == '.pstats'
+        assert pstats.Stats(str(files[0])).total_calls > 0
+
+    def test_sampling(self, tmp_path):
+        from profiling import SAMPLING, LoopProfiler
+
+        profiler = LoopProfiler(str(tmp_path), iterations=3, mode=SAMPLING)
+        profiler.request()
+        self.run_iterations(profiler, 5)
+        files = list(tmp_path.iterdir())
+        assert len(files) == 1 and files[0].suffix == '.folded'
+        lines = files[0].read_text().splitlines()
+        assert lines and all(line.rsplit(' ', 1)[1].isdigit()
+                             for line in lines), (
+            'Проверьте формат свёрнутых стеков'
+        )
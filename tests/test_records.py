@@ -0,0 +1,45 @@
+import pytest
+
+
+class TestHomework:
+
+    def test_from_dict_keeps_only_used_fields(self):
+        from records import Homework
+
+        record = Homework.from_dict({
+            'id': 123,
+            'status': 'approved',
+            'homework_name': 'hw',
+            'reviewer_comment': 'Всё нравится',
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': 'Итоговый проект',
+        })
+        assert record == Homework(123, 'hw', 'approved',
+                                  '2020-02-13T14:40:57Z')
+        assert not hasattr(record, '__dict__'), (
+            'Проверьте, что запись не хранит лишних полей'
+        )
+
+    @pytest.mark.parametrize('data, error', [
+        ([], 'ExceptionResponseError'),
+        ({'homework_name': 'hw', 'status': 'unknown'},
+         'ExceptionStatusUnknown'),
+        ({'homework_name': 'hw'}, 'ExceptionStatusUnknown'),
+        ({'status': 'approved'}, 'ExceptionStatusUnknown'),
+    ])
+    def test_invalid(self, data, error):
+        import exceptions
+        from records import Homework
+
+        with pytest.raises(getattr(exceptions, error)):
+            Homework.from_dict(data)
+
+    def test_parse_status_accepts_record(self):
+        import homework
+        from records import Homework
+
+        message = homework.parse_status(Homework(1, 'hw', 'rejected'))
+        assert message == (
+            'Изменился статус проверки работы "hw". '
+            'Работа проверена: у ревьюера есть замечания.'
+        )
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import requests
+
+
+class FakeResponse:
+
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode('utf-8')
+
+
+class FakeSession:
+
+    def __init__(self):
+        self.responses = [
+            FakeResponse(200, {'homeworks': [], 'current_date': 1}),
+            FakeResponse(200, {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': 2,
+            }),
+            requests.ConnectTimeout('timed out'),
+        ]
+
+    def get(self, url, params=None, **kwargs):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def close(self):
+        pass
+
+
+class TestRecordAndReplay:
+
+    def test_replay_recorded_traffic(self, tmp_path):
+        from engine import PollingEngine
+        from logconfig import tenant_id_var
+        from ratelimit import TokenBucket
+        from replay import (Recorder, RecordingSession, ReplayBot,
+                            ReplaySession, load_recordings, replay)
+        from tenants import Tenant
+
+        path = str(tmp_path / 'recording.jsonl.gz')
+        session = RecordingSession(FakeSession(), Recorder(path))
+        tenant_id_var.set('7')
+        for _ in range(2):
+            session.get('url', params={'from_date': 0})
+        try:
+            session.get('url', params={'from_date': 0})
+        except requests.ConnectTimeout:
+            pass
+        session.close()
+
+        records = load_recordings([path])
+        assert [record.get('status') for record in records] == [
+            200, 200, None
+        ], 'Проверьте, что записываются и ответы, и ошибки'
+        assert records[2]['error'] == 'ConnectTimeout'
+        assert 'token' not in json.dumps(records)
+
+        bot = ReplayBot()
+        replay_session = ReplaySession(speed=0)
+        engine = PollingEngine(
+            bot, [Tenant('7', 'replay', 7)], session=replay_session,
+            api_budget=TokenBucket(float('inf')),
+        )
+        results = asyncio.run(replay(engine, replay_session, records, 0))
+        assert results['polls'] == 3
+        assert results['errors'] == 1, (
+            'Проверьте, что записанная ошибка воспроизводится'
+        )
+        assert bot.sent == 1, (
+            'Проверьте, что воспроизведение доходит до отправки уведомлений'
+        )
+
+    def test_cut_off_recording(self, tmp_path):
+        from replay import FLUSH_EVERY, Recorder, load_recordings
+
+        path = str(tmp_path / 'recording.jsonl.gz')
+        recorder = Recorder(path)
+        for i in range(FLUSH_EVERY * 2 + 50):
+            recorder.write({'t': i, 'body': 'x' * 50})
+        records = load_recordings([path])
+        assert len(records) >= FLUSH_EVERY * 2, (
+            'Проверьте, что оборванная запись читается до обрыва'
+        )
+        recorder.close()
@@ -0,0 +1,79 @@
+class State:
+
+    def __init__(self, failures=0, reviewing=False, idle_polls=0):
+        self.failures = failures
+        self.reviewing = reviewing
+        self.idle_polls = idle_polls
+
+
+class TestAdaptivePolicy:
+
+    def make_policy(self, rand=lambda: 1.0):
+        from scheduler import AdaptivePolicy
+
+        return AdaptivePolicy(
+            base=600, reviewing=120, idle_max=3600,
+            error_base=30, error_max=240, rand=rand,
+        )
+
+    def test_reviewing_polls_faster(self):
+        policy = self.make_policy()
+        assert policy.next_interval(State(reviewing=True)) == 120
+        assert policy.next_interval(State()) == 600
+
+    def test_idle_backoff(self):
+        policy = self.make_policy()
+        intervals = [
+            policy.next_interval(State(idle_polls=n)) for n in range(5)
+        ]
+        assert intervals == [600, 1200, 2400, 3600, 3600], (
+            'Проверьте, что без изменений пауза растёт до idle_max'
+        )
+
+    def test_error_backoff_with_jitter(self):
+        policy = self.make_policy()
+        intervals = [
+            policy.next_interval(State(failures=n, reviewing=True))
+            for n in range(1, 6)
+        ]
+        assert intervals == [30, 60, 120, 240, 240], (
+            'Проверьте экспоненциальную паузу после ошибок'
+        )
+        low = self.make_policy(rand=lambda: 0.0)
+        assert low.next_interval(State(failures=3)) == 60, (
+            'Проверьте, что пауза размывается случайной добавкой'
+        )
+
+
+class TestTimingWheel:
+
+    def test_fires_on_due_tick(self):
+        from scheduler import TimingWheel
+
+        wheel = TimingWheel(tick=1.0, slots=4)
+        wheel.schedule('a', 1)
+        wheel.schedule('b', 2.5)
+        wheel.schedule('c', 6)
+        fired = {}
+        for tick in range(1, 8):
+            for item in wheel.advance():
+                fired[item] = tick
+        assert fired == {'a': 1, 'b': 3, 'c': 6}, (
+            'Проверьте, что записи срабатывают на своём такте, '
+            'в том числе через оборот колеса'
+        )
+        assert len(wheel) == 0
+
+    def test_phase_offsets_spread(self):
+        from scheduler import phase_offset
+
+        offsets = [phase_offset(f'tenant{i}', 600) for i in range(6000)]
+        assert offsets == [
+            phase_offset(f'tenant{i}', 600) for i in range(6000)
+        ], 'Проверьте, что сдвиг постоянен для студента'
+        buckets = [0] * 10
+        for offset in offsets:
+            buckets[offset * 10 // 600] += 1
+        assert min(buckets) > 400, (
+            'Проверьте, что опросы равномерно распределены по интервалу'
+        )
@@ -0,0 +1,56 @@
+class TestSettings:
+
+    def test_read_from_environ(self):
+        from settings import Settings
+
+        settings = Settings({'WORKERS': '3', 'LEASES': '1'})
+        assert settings.WORKERS == 3 and settings.LEASES, (
+            'Проверьте, что настройки читаются из переданного окружения'
+        )
+        assert settings.LEASE_DB == settings.STATE_DB
+        assert not settings.HEDGE_REQUESTS
+
+    def test_engine_uses_loaded_settings(self, monkeypatch):
+        import settings
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        monkeypatch.setattr(settings, '_current', None)
+        monkeypatch.setenv('ERROR_WINDOW', '42')
+        monkeypatch.setattr('dotenv.load_dotenv', lambda: None)
+        settings.load_settings()
+        engine = PollingEngine(None, [Tenant('1', 'a', 1)])
+        assert engine.errors.window == 42, (
+            'Проверьте, что движок берёт настройки, прочитанные при '
+            'запуске, а не при импорте'
+        )
+
+    def test_retry_time(self, monkeypatch):
+        import homework
+        import settings
+
+        monkeypatch.setattr(settings, '_current', None)
+        monkeypatch.setenv('RETRY_TIME', '300')
+        assert homework.RETRY_TIME == 300, (
+            'Проверьте, что RETRY_TIME читается из окружения и доступен '
+            'как homework.RETRY_TIME'
+        )
+        assert settings.Settings({}).RETRY_TIME == 600
+
+    def test_hedging_headroom(self):
+        from engine import PollingEngine
+        from hedging import HedgedCaller
+        from settings import Settings
+        from tenants import Tenant
+
+        settings = Settings({'POLL_CONCURRENCY': '8', 'HEDGE_REQUESTS': '1'})
+        assert settings.POOL_MAXSIZE == 16, (
+            'Проверьте, что с хеджированием пул соединений вдвое больше'
+        )
+        engine = PollingEngine(
+            None, [Tenant('1', 'a', 1)], concurrency=8,
+            hedging=HedgedCaller(), settings=settings,
+        )
+        assert engine.executor._max_workers == 16 + settings.SEND_WORKERS, (
+            'Проверьте, что потоков хватает на дублирующие запросы'
+        )
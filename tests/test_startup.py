@@ -0,0 +1,25 @@
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+root_dir = dirname(dirname(abspath(__file__)))
+
+
+class TestColdStart:
+
+    def test_import_has_no_side_effects(self):
+        code = (
+            'import logging, sys\n'
+            'import homework\n'
+            'heavy = {"requests", "telegram", "dotenv", "asyncio"}\n'
+            'print(sorted(heavy & set(sys.modules)))\n'
+            'print(logging.getLogger().handlers)\n'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=root_dir, check=True,
+            capture_output=True, text=True,
+        ).stdout.splitlines()
+        assert output == ['[]', '[]'], (
+            'Проверьте, что импорт homework не тянет тяжёлые зависимости '
+            'и не настраивает логирование'
+        )
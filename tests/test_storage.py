@@ -0,0 +1,207 @@
+from utils import FakeClock
+
+
+class TestWatermarkStore:
+
+    def test_advance_only_forward(self, tmp_path):
+        from storage import WatermarkStore
+
+        store = WatermarkStore(str(tmp_path / 'state.sqlite3'))
+        assert store.get('1') is None
+        store.advance('1', 100)
+        store.advance('1', 50)
+        assert store.get('1') == 100, (
+            'Проверьте, что отметка не сдвигается назад'
+        )
+        store.advance('1', 200)
+        store.advance('2', 10)
+        assert store.load_all() == {'1': 200, '2': 10}
+        store.close()
+
+    def test_survives_restart(self, tmp_path):
+        from storage import WatermarkStore
+
+        path = str(tmp_path / 'state.sqlite3')
+        store = WatermarkStore(path)
+        store.advance('1', 100)
+        store.close()
+        assert WatermarkStore(path).get('1') == 100, (
+            'Проверьте, что отметка сохраняется на диск'
+        )
+
+
+class TestOutboxStore:
+
+    def test_idempotent_and_retry(self, tmp_path):
+        from storage import OutboxStore
+
+        clock = FakeClock(1000.0)
+        outbox = OutboxStore(
+            str(tmp_path / 'state.sqlite3'), max_attempts=2, clock=clock
+        )
+        outbox.add(1, 'first', key='a')
+        outbox.add(1, 'again', key='a')
+        outbox.add(2, 'second', key='b')
+        assert outbox.claim() == [], (
+            'Проверьте, что сообщения сохраняются только в flush()'
+        )
+        outbox.flush()
+        claimed = outbox.claim()
+        assert [text for _, _, text in claimed] == ['first', 'second'], (
+            'Проверьте, что сообщение с тем же ключом не записывается дважды'
+        )
+        first, second = claimed[0][0], claimed[1][0]
+        assert outbox.claim() == [], (
+            'Проверьте, что забранное сообщение не выдаётся повторно'
+        )
+        outbox.delivered(second)
+        outbox.failed(first)
+        assert outbox.claim() == [], (
+            'Проверьте, что повтор откладывается'
+        )
+        clock.now += 3600
+        assert [row[0] for row in outbox.claim()] == [first]
+        outbox.failed(first)
+        clock.now += 3600
+        assert outbox.claim() == [], (
+            'Проверьте, что после max_attempts сообщение не повторяется'
+        )
+        outbox.close()
+
+    def test_lease_expires(self, tmp_path):
+        from storage import OutboxStore
+
+        clock = FakeClock(1000.0)
+        path = str(tmp_path / 'state.sqlite3')
+        first = OutboxStore(path, clock=clock)
+        second = OutboxStore(path, clock=clock)
+        first.add(1, 'text', key='a')
+        first.flush()
+        assert len(first.claim()) == 1
+        assert second.claim() == [], (
+            'Проверьте, что два процесса не забирают одно сообщение'
+        )
+        clock.now += first.lease
+        assert len(second.claim()) == 1, (
+            'Проверьте, что сообщение упавшего процесса снова доступно'
+        )
+
+    def test_pending_survives_restart(self, tmp_path):
+        from storage import OutboxStore
+
+        path = str(tmp_path / 'state.sqlite3')
+        outbox = OutboxStore(path)
+        outbox.add(1, 'text', key='a')
+        outbox.close()
+        assert [row[1:] for row in OutboxStore(path).claim()] == [
+            ('1', 'text')
+        ], 'Проверьте, что недоставленное сообщение сохраняется на диск'
+
+
+    def test_flush_keeps_buffer_when_locked(self, tmp_path):
+        import sqlite3
+
+        from storage import OutboxStore
+
+        path = str(tmp_path / 'state.sqlite3')
+        outbox = OutboxStore(path)
+        outbox.connection.execute('PRAGMA busy_timeout = 0')
+        outbox.add(1, 'first', key='a')
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute('BEGIN IMMEDIATE')
+        try:
+            outbox.flush()
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError('flush() должен падать, пока база занята')
+        other.execute('ROLLBACK')
+        other.close()
+        assert outbox.claim() == [], (
+            'Проверьте, что после ошибки транзакция откатывается'
+        )
+        outbox.flush()
+        assert [text for _, _, text in outbox.claim()] == ['first'], (
+            'Проверьте, что несохранённые сообщения остаются в буфере'
+        )
+
+    def test_claim_own_chats_and_renew(self, tmp_path):
+        from storage import OutboxStore
+
+        clock = FakeClock(1000.0)
+        outbox = OutboxStore(
+            str(tmp_path / 'state.sqlite3'), lease=120, clock=clock
+        )
+        for chat_id in (1, 2, 1):
+            outbox.add(chat_id, f'to {chat_id}')
+        outbox.flush()
+        claimed = outbox.claim(owns_chat=lambda chat_id: chat_id == '1')
+        assert [chat for _, chat, _ in claimed] == ['1', '1'], (
+            'Проверьте, что процесс забирает сообщения только своих чатов'
+        )
+        assert outbox.claim(limit=0) == []
+        clock.now += 100
+        outbox.renew([message_id for message_id, _, _ in claimed])
+        clock.now += 100
+        assert [chat for _, chat, _ in outbox.claim()] == ['2'], (
+            'Проверьте, что продлённая аренда не истекает'
+        )
+
+    def test_claim_waits_for_window(self, tmp_path):
+        from storage import OutboxStore
+
+        clock = FakeClock(1000.0)
+        outbox = OutboxStore(
+            str(tmp_path / 'state.sqlite3'), window=10, clock=clock
+        )
+        outbox.add(1, 'first')
+        outbox.flush()
+        assert outbox.claim() == [], (
+            'Проверьте, что новое сообщение ждёт окна склейки'
+        )
+        clock.now += 8
+        outbox.add(1, 'second')
+        outbox.add(2, 'other')
+        outbox.flush()
+        clock.now += 2
+        claimed = outbox.claim()
+        assert [text for _, _, text in claimed] == ['first', 'second'], (
+            'Проверьте, что вместе с созревшим сообщением забираются '
+            'ждущие сообщения того же чата'
+        )
+
+    def test_claim_limit_covers_waiting(self, tmp_path):
+        from storage import OutboxStore
+
+        clock = FakeClock(1000.0)
+        outbox = OutboxStore(
+            str(tmp_path / 'state.sqlite3'), window=10, clock=clock
+        )
+        outbox.add(1, 'first')
+        outbox.flush()
+        clock.now += 8
+        outbox.add(1, 'second')
+        outbox.flush()
+        clock.now += 2
+        assert [text for _, _, text in outbox.claim(limit=1)] == ['first'], (
+            'Проверьте, что ждущие сообщения не превышают limit'
+        )
+
+
+class TestHistoryStore:
+
+    def test_load_and_trim(self, tmp_path):
+        from records import Homework
+        from storage import HistoryStore
+
+        store = HistoryStore(str(tmp_path / 'state.sqlite3'))
+        for i in range(5):
+            store.add('1', Homework(i, f'hw{i}', 'approved', f'd{i}'))
+        store.add('2', Homework(None, 'x', 'reviewing'))
+        store.trim(2)
+        assert store.load_all() == [
+            ('1', Homework(3, 'hw3', 'approved', 'd3')),
+            ('1', Homework(4, 'hw4', 'approved', 'd4')),
+            ('2', Homework(None, 'x', 'reviewing')),
+        ], 'Проверьте, что у студента остаются последние изменения'
+        store.close()
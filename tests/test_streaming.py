@@ -0,0 +1,110 @@
+import json
+
+import pytest
+import requests
+
+
+def chunked(data, size):
+    raw = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return [raw[start:start + size] for start in range(0, len(raw), size)]
+
+
+class TestStreamingObjectParser:
+    DATA = {
+        'homeworks': [
+            {'id': number, 'homework_name': f'Работа {number}',
+             'status': 'approved'}
+            for number in range(5)
+        ],
+        'current_date': 1000198991,
+    }
+
+    @pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 100000])
+    def test_any_chunk_size(self, size):
+        from streaming import StreamingObjectParser
+
+        parser = StreamingObjectParser(chunked(self.DATA, size), 'homeworks')
+        assert list(parser.items()) == self.DATA['homeworks'], (
+            'Проверьте, что элементы разбираются при любой нарезке ответа'
+        )
+        assert parser.values == {'current_date': 1000198991}, (
+            'Проверьте, что число на границе куска не обрезается'
+        )
+
+    def test_early_stop(self):
+        from streaming import StreamingObjectParser
+
+        chunks = iter(chunked(self.DATA, 10))
+        parser = StreamingObjectParser(chunks, 'homeworks')
+        items = parser.items()
+        assert next(items)['id'] == 0
+        assert next(chunks, None) is not None, (
+            'Проверьте, что ответ не дочитывается до конца заранее'
+        )
+
+    def test_not_dict(self):
+        from streaming import StreamingObjectParser
+
+        parser = StreamingObjectParser([b'[{"homeworks": []}]'], 'homeworks')
+        with pytest.raises(TypeError):
+            list(parser.items())
+
+
+class MockStreamResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def iter_content(self, chunk_size):
+        return iter(chunked(self.data, 5))
+
+    def close(self):
+        pass
+
+
+class TestStreamApiAnswer:
+
+    def test_keep_only_changed(self, monkeypatch):
+        import homework
+
+        def mock_get(url, stream=False, **kwargs):
+            assert stream, 'Проверьте, что ответ запрашивается потоком'
+            return MockStreamResponse(TestStreamingObjectParser.DATA)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        answer = homework.stream_api_answer(
+            {}, 1, keep=lambda homework: homework['id'] % 2 == 0
+        )
+        assert [hw['id'] for hw in answer['homeworks']] == [0, 2, 4]
+        assert answer['current_date'] == 1000198991
+
+    def test_no_homeworks_key(self, monkeypatch):
+        import homework
+        from exceptions import ExceptionResponseError
+
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda url, **kwargs: MockStreamResponse({'current_date': 1}),
+        )
+        with pytest.raises(ExceptionResponseError):
+            homework.stream_api_answer({}, 1)
+
+    def test_limit_moves_watermark(self, monkeypatch):
+        import time
+
+        import homework
+
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda url, **kwargs: MockStreamResponse(
+                TestStreamingObjectParser.DATA
+            ),
+        )
+        started = int(time.time())
+        answer = homework.stream_api_answer({}, 1, limit=2)
+        assert len(answer['homeworks']) == 2
+        assert answer['current_date'] >= started, (
+            'Проверьте, что после остановки по limit отметка сдвигается '
+            'на время запроса'
+        )
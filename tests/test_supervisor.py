@@ -0,0 +1,82 @@
+import sys
+import threading
+
+LOCK = threading.Lock()
+
+
+def exit_at_once(index, workers):
+    sys.exit(3)
+
+
+def take_lock(index, workers):
+    sys.exit(0 if LOCK.acquire(timeout=2) else 4)
+
+
+class TestHashRing:
+
+    def test_shards_cover_all_tenants(self):
+        from supervisor import shard
+        from tenants import Tenant
+
+        tenants = [Tenant(str(i), 'token', i) for i in range(1000)]
+        shards = [shard(tenants, index, 4) for index in range(4)]
+        assert sorted(
+            tenant.tenant_id for part in shards for tenant in part
+        ) == sorted(tenant.tenant_id for tenant in tenants), (
+            'Проверьте, что каждый студент попадает ровно к одному воркеру'
+        )
+        assert all(150 < len(part) < 350 for part in shards), (
+            'Проверьте, что студенты делятся между воркерами примерно поровну'
+        )
+
+    def test_resize_moves_few_tenants(self):
+        from supervisor import HashRing
+
+        keys = [str(i) for i in range(1000)]
+        before = HashRing(range(4))
+        after = HashRing(range(5))
+        moved = sum(before.node(key) != after.node(key) for key in keys)
+        assert moved < 350, (
+            'Проверьте, что при добавлении воркера переезжает около 1/N '
+            'студентов'
+        )
+
+
+class TestSupervisor:
+
+    def test_restarts_crashed_worker(self):
+        from supervisor import Supervisor
+
+        supervisor = Supervisor(
+            exit_at_once, 2, restart_delay=0, stop_timeout=5
+        )
+        supervisor.check()
+        first = supervisor.processes[0]
+        for process in supervisor.processes.values():
+            process.join(5)
+        supervisor.check()
+        assert first.exitcode == 3
+        assert supervisor.processes[0] is not first, (
+            'Проверьте, что упавший воркер перезапускается'
+        )
+        assert supervisor.crashes == {0: 1, 1: 1}
+        supervisor.resize(3)
+        assert supervisor.processes == {}
+        supervisor.check()
+        assert sorted(supervisor.processes) == [0, 1, 2], (
+            'Проверьте, что после изменения числа воркеров они запускаются '
+            'заново'
+        )
+        supervisor.stop_workers()
+
+    def test_workers_skip_parent_threads(self):
+        from supervisor import Supervisor
+
+        supervisor = Supervisor(take_lock, 1, stop_timeout=5)
+        with LOCK:
+            supervisor.check()
+            process = supervisor.processes[0]
+            process.join(10)
+        assert process.exitcode == 0, (
+            'Проверьте, что воркер не наследует замки и потоки супервизора'
+        )
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import sqlite3
+
+
+def write_tenants(path, records, mtime):
+    path.write_text(json.dumps(records))
+    os.utime(path, ns=(mtime, mtime))
+
+
+class TestTenantRegistry:
+
+    def test_reload_diff(self, tmp_path):
+        from tenants import TenantRegistry, load_tenants
+
+        path = tmp_path / 'tenants.json'
+        write_tenants(path, [
+            {'tenant_id': 1, 'practicum_token': 'a', 'chat_id': 10},
+            {'tenant_id': 2, 'practicum_token': 'b', 'chat_id': 20},
+        ], 10 ** 18)
+        registry = TenantRegistry(str(path), load_tenants)
+        assert [t.tenant_id for t in registry.load()] == ['1', '2']
+        assert registry.reload() is None, (
+            'Проверьте, что неизменённый файл не перечитывается'
+        )
+        write_tenants(path, [
+            {'tenant_id': 1, 'practicum_token': 'a', 'chat_id': 10},
+            {'tenant_id': 2, 'practicum_token': 'new', 'chat_id': 20},
+            {'tenant_id': 3, 'practicum_token': 'c', 'chat_id': 30},
+        ], 2 * 10 ** 18)
+        diff = registry.reload()
+        assert [t.tenant_id for t in diff.added] == ['3']
+        assert [t.practicum_token for t in diff.updated] == ['new']
+        assert diff.removed == [], (
+            'Проверьте, что при перечитывании находится разница списков'
+        )
+        write_tenants(path, [
+            {'tenant_id': 3, 'practicum_token': 'c', 'chat_id': 30},
+        ], 3 * 10 ** 18)
+        assert [t.tenant_id for t in registry.reload().removed] == ['1', '2']
+
+    def test_broken_file_keeps_version(self, tmp_path):
+        from tenants import TenantRegistry, load_tenants
+
+        path = tmp_path / 'tenants.json'
+        write_tenants(path, [], 10 ** 18)
+        registry = TenantRegistry(str(path), load_tenants)
+        registry.load()
+        path.write_text('[{"tenant_id": ')
+        os.utime(path, ns=(2 * 10 ** 18, 2 * 10 ** 18))
+        try:
+            registry.reload()
+        except ValueError:
+            pass
+        assert registry.changed(), (
+            'Проверьте, что недописанный файл перечитывается повторно'
+        )
+
+    def test_invalid_tenants_skipped(self):
+        from tenants import Tenant, valid_tenants
+
+        tenants = valid_tenants([
+            Tenant('1', 'a', 10), Tenant('2', '', 20), Tenant('3', 'c', None),
+            Tenant('4', 'd', 40, template='Hi $who'),
+        ])
+        assert [t.tenant_id for t in tenants] == ['1'], (
+            'Проверьте, что студенты без токена, чата или с некорректным '
+            'шаблоном пропускаются'
+        )
+
+    def test_load_from_sqlite(self, tmp_path):
+        from tenants import load_tenants_db
+
+        path = str(tmp_path / 'tenants.sqlite3')
+        connection = sqlite3.connect(path)
+        connection.execute(
+            'CREATE TABLE tenants (tenant_id TEXT PRIMARY KEY, '
+            'practicum_token TEXT, chat_id INTEGER, locale TEXT, '
+            'template TEXT)'
+        )
+        connection.execute(
+            "INSERT INTO tenants VALUES ('1', 'a', 10, 'en', NULL)"
+        )
+        connection.commit()
+        connection.close()
+        tenants = load_tenants_db(path)
+        assert [(t.tenant_id, t.locale) for t in tenants] == [('1', 'en')], (
+            'Проверьте, что студенты читаются из таблицы tenants'
+        )
+
+
+class TestEngineTenants:
+
+    def test_apply_tenants(self):
+        from engine import PollingEngine
+        from tenants import Tenant, TenantDiff
+
+        engine = PollingEngine(
+            None, [Tenant('1', 'a', 10), Tenant('2', 'b', 20)]
+        )
+        kept = engine.by_tenant['1']
+        seen = []
+        engine.tenant_listeners.append(seen.append)
+        engine.apply_tenants(TenantDiff(
+            added=[Tenant('3', 'c', 30)],
+            removed=[Tenant('2', 'b', 20)],
+            updated=[Tenant('1', 'new', 11)],
+        ))
+        assert sorted(engine.by_tenant) == ['1', '3']
+        assert engine.by_tenant['1'] is kept, (
+            'Проверьте, что изменённый студент не создаётся заново'
+        )
+        assert kept.headers == {'Authorization': 'OAuth new'}
+        assert len(engine.wheel) == 1, (
+            'Проверьте, что в колесо ставится только новый студент'
+        )
+        assert [t.chat_id for t in seen[0]] == [11, 30]
+
+    def test_reload_survives_errors(self):
+        from engine import PollingEngine
+        from tenants import Tenant, TenantDiff
+
+        class FlakyRegistry:
+
+            def __init__(self):
+                self.diffs = [
+                    TenantDiff([], [], [Tenant('unknown', 'x', 90)]),
+                    TenantDiff([Tenant('2', 'b', 20)], [], []),
+                ]
+
+            def reload(self):
+                return self.diffs.pop(0)
+
+        engine = PollingEngine(
+            None, [Tenant('1', 'a', 10)], registry=FlakyRegistry(),
+            reload_interval=0,
+        )
+
+        async def watch():
+            task = asyncio.ensure_future(engine.watch_tenants())
+            while '2' not in engine.by_tenant and not task.done():
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(watch())
+        assert sorted(engine.by_tenant) == ['1', '2'], (
+            'Проверьте, что ошибка перечитывания не останавливает его'
+        )
+
+    def test_removed_tenant_not_polled(self, monkeypatch):
+        import requests
+
+        from engine import PollingEngine
+        from tenants import Tenant
+
+        requested = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            requested.append(headers)
+            raise requests.ConnectionError
+
+        class MockBot:
+
+            def __init__(self):
+                self.sent = []
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                self.sent.append(text)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = MockBot()
+        engine = PollingEngine(bot, [Tenant('1', 'a', 10)])
+        state = engine.states[0]
+
+        async def poll_removed():
+            engine.start()
+            engine.remove_tenant('1')
+            await engine.poll_and_reschedule(state)
+            await engine.dispatcher.join()
+            await engine.stop()
+
+        asyncio.run(poll_removed())
+        assert requested == [] and bot.sent == [], (
+            'Проверьте, что удалённый студент больше не опрашивается'
+        )
+        assert len(engine.wheel) == 0, (
+            'Проверьте, что опрос удалённого студента не переносится'
+        )